@@ -1,10 +1,19 @@
 # app/__init__.py
 from flask import Flask
 from app.extensions import db, jwt
+from app.database import configure_engine_options, register_sqlite_pragmas
 from app.config import Config 
 from app.api.restaurants import restaurants_bp
 from app.api.orders import orders_bp
 from app.errors import register_error_handlers
+from app.search import search_index
+from app.cache import cache
+from app.events import order_events
+from app.hashing import password_hasher
+from app.instrumentation import init_instrumentation
+from app.serialization import init_json
+from app.ratelimit import rate_limiter
+from app.compression import init_compression
 from flask_cors import CORS # For handling Cross-Origin Resource Sharing (CORS)
 
 
@@ -13,12 +22,24 @@ def create_app(config_class=Config):  # <--- 1. The "Machine" starts here
     app.config.from_object(config_class) # <--- 3. Install the specific parts (settings)
 
     # Initialize Flask extensions
+    configure_engine_options(app)     # <--- Tune the connection pool before the engine is built
     db.init_app(app)                  # <--- 4. Plug in the engine (Database)
+    register_sqlite_pragmas(app)      # <--- SQLite only: WAL mode & friends on every connection
     jwt.init_app(app)                 # <--- Plug in the JWT system for authentication
     CORS(app)                         # <--- Plug in CORS to allow cross-origin requests (e.g., from React frontend)
+    search_index.init_app(app)        # <--- Plug in the full-text search index (built lazily on first use)
+    cache.init_app(app)               # <--- Plug in the cache for restaurant & menu pages
+    order_events.init_app(app)        # <--- Plug in the order events broker (pushed status changes)
+    password_hasher.init_app(app)     # <--- Plug in the bounded password hashing pool
+    init_json(app)                    # <--- Fast JSON encoder (orjson) for every jsonify()
+    init_instrumentation(app)         # <--- Time every request & SQL statement (Server-Timing, /api/system/metrics)
+    rate_limiter.init_app(app)        # <--- Token buckets per client + load shedding (429/503 before any database work)
+    init_compression(app)             # <--- gzip/brotli for large JSON bodies (after the other hooks, so it is timed too)
 
     # --- REGISTER BLUEPRINTS HERE ---
     from app.api.auth import auth_bp
+    from app.api.system import system_bp
+    from app.api.analytics import analytics_bp
     
     # url_prefix means all routes in auth.py will start with /api/auth
     # So the route is now: POST /api/auth/register
@@ -30,6 +51,29 @@ def create_app(config_class=Config):  # <--- 1. The "Machine" starts here
     # Register the orders blueprint
     app.register_blueprint(orders_bp, url_prefix='/api/orders')  
 
+    # Register the analytics blueprint (sales dashboards, reporting users only)
+    app.register_blueprint(analytics_bp, url_prefix='/api/analytics')
+
+    # Register the system blueprint (operational info like cache statistics)
+    app.register_blueprint(system_bp, url_prefix='/api/system')
+
+    # Serve the HTML frontend (precompressed by `flask frontend build`, see app/frontend.py)
+    if app.config['FRONTEND_ENABLED']:
+        from app.frontend import frontend_bp
+        app.register_blueprint(frontend_bp)
+
+    # Resolve the user behind a JWT from a small cache instead of the database
+    from app.identity import register_identity_loaders
+    register_identity_loaders(app)
+
+    # --- COMMAND LINE TOOLS (flask db upgrade / flask catalog import / flask orders export ...) ---
+    from app.cli import catalog_cli, orders_cli, analytics_cli, db_cli, frontend_cli
+    app.cli.add_command(db_cli)
+    app.cli.add_command(catalog_cli)
+    app.cli.add_command(orders_cli)
+    app.cli.add_command(analytics_cli)
+    app.cli.add_command(frontend_cli)
+
     # --- NEW: Register Error Handlers ---
     # from app.errors import register_error_handlers
     register_error_handlers(app)
@@ -0,0 +1,128 @@
+"""
+Per restaurant, per day sales rollups (the restaurant_daily_sales table).
+
+The order routes keep the rollups current as they write, in the SAME transaction:
+- record_order_placed(): +1 order and +total revenue for that restaurant and day,
+- record_status_changes(): moves orders in / out of the delivered and cancelled columns.
+Both are a single "INSERT ... ON CONFLICT DO UPDATE SET x = x + :delta" (see app.database.upsert),
+so two workers updating the same row at once can't lose each other's numbers.
+
+An order is always counted on the day it was PLACED, even if it is delivered the next day.
+
+backfill() rebuilds the rollups from the raw orders, e.g. after deploying this table or to
+repair them: `flask analytics backfill --from 2024-01-01`.
+"""
+
+# app/analytics.py
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from app.database import upsert
+from app.extensions import db
+from app.models import Order, RestaurantDailySales
+
+COUNTERS = ('order_count', 'revenue', 'delivered_count', 'delivered_revenue',
+            'cancelled_count', 'cancelled_revenue')
+
+# Statuses that have their own columns in the rollup
+TRACKED_STATUSES = ('delivered', 'cancelled')
+
+
+def _day(value):
+    # SQLite's DATE() gives back a string, the other databases a date
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value
+
+
+def _apply(connection, changes):
+    # changes: {(restaurant_id, day): {counter: delta}} -> ONE executemany upsert
+    rows = []
+    for (restaurant_id, day), deltas in changes.items():
+        row = {"restaurant_id": restaurant_id, "day": day}
+        row.update({name: deltas.get(name, 0) for name in COUNTERS})
+        rows.append(row)
+    upsert(connection, RestaurantDailySales.__table__, rows,
+           key_columns=("restaurant_id", "day"), increment_columns=COUNTERS)
+
+
+def record_order_placed(order):
+    # Call after flush (the order needs its created_at), before commit
+    key = (order.restaurant_id, _day(order.created_at))
+    _apply(db.session.connection(), {key: {"order_count": 1, "revenue": order.total_price}})
+
+
+def record_status_changes(orders, old_status, new_status):
+    """
+    Call before commit with the orders (ORM objects or rows with restaurant_id, created_at and
+    total_price) that just moved from old_status to new_status. Orders of the same restaurant
+    and day are added up first, so a bulk update is still one statement here.
+    """
+    if old_status == new_status:
+        return
+    changes = {}
+    for order in orders:
+        deltas = changes.setdefault((order.restaurant_id, _day(order.created_at)), {})
+        for status, sign in ((old_status, -1), (new_status, 1)):
+            if status in TRACKED_STATUSES:
+                deltas[f"{status}_count"] = deltas.get(f"{status}_count", 0) + sign
+                deltas[f"{status}_revenue"] = deltas.get(f"{status}_revenue", 0) + sign * Decimal(order.total_price or 0)
+    changes = {key: deltas for key, deltas in changes.items() if deltas}
+    if changes:
+        _apply(db.session.connection(), changes)
+
+
+def backfill(start=None, end=None):
+    """
+    Recompute the rollups for the days in [start, end) (dates; None = no limit) from the orders
+    table in one transaction. Returns the number of (restaurant, day) rows written.
+    """
+    day = db.func.date(Order.created_at)
+
+    def status_sum(status, value):
+        return db.func.coalesce(db.func.sum(db.case((Order.status == status, value), else_=0)), 0)
+
+    query = db.select(
+        Order.restaurant_id,
+        day.label("day"),
+        db.func.count(Order.id).label("order_count"),
+        db.func.coalesce(db.func.sum(Order.total_price), 0).label("revenue"),
+        status_sum('delivered', 1).label("delivered_count"),
+        status_sum('delivered', Order.total_price).label("delivered_revenue"),
+        status_sum('cancelled', 1).label("cancelled_count"),
+        status_sum('cancelled', Order.total_price).label("cancelled_revenue"),
+    ).group_by(Order.restaurant_id, day)
+
+    # Compare against datetimes so the (created_at, id) index can be used
+    delete = db.delete(RestaurantDailySales)
+    if start is not None:
+        query = query.where(Order.created_at >= datetime.combine(start, time.min))
+        delete = delete.where(RestaurantDailySales.day >= start)
+    if end is not None:
+        query = query.where(Order.created_at < datetime.combine(end, time.min))
+        delete = delete.where(RestaurantDailySales.day < end)
+
+    with db.engine.begin() as connection:
+        rows = [dict(row._mapping, day=_day(row.day)) for row in connection.execute(query)]
+        connection.execute(delete) # Days that no longer have any orders must disappear too
+        if rows:
+            connection.execute(db.insert(RestaurantDailySales), rows)
+    return len(rows)
+
+
+def sales_query(start=None, end=None):
+    # Rollup rows for [start, end); narrow it further with .where(...)
+    query = db.select(RestaurantDailySales)
+    if start is not None:
+        query = query.where(RestaurantDailySales.day >= start)
+    if end is not None:
+        query = query.where(RestaurantDailySales.day < end)
+    return query
+
+
+def default_range(days=30):
+    # The last `days` days, today included
+    end = datetime.utcnow().date() + timedelta(days=1)
+    return end - timedelta(days=days), end
@@ -0,0 +1,97 @@
+# app/api/analytics.py
+# Sales dashboards, answered from the restaurant_daily_sales rollups (app/analytics.py),
+# never from the raw orders: a year of one restaurant is at most 366 small rows.
+from datetime import date
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.extensions import db
+from app.models import Restaurant, RestaurantDailySales
+from app.analytics import COUNTERS, sales_query, default_range
+
+analytics_bp = Blueprint('analytics', __name__)
+
+
+# --- HELPERS ---
+@analytics_bp.before_request
+@jwt_required()
+def reporting_users_only():
+    # Only users listed in REPORTING_USER_IDS may see sales figures
+    if get_jwt_identity() not in current_app.config['REPORTING_USER_IDS']:
+        return jsonify({"error": "Reporting access required"}), 403
+
+
+def _date_range():
+    # ?from=2024-05-01&to=2024-06-01 (from included, to excluded); default: the last 30 days
+    default_start, default_end = default_range()
+    try:
+        start = date.fromisoformat(request.args['from']) if request.args.get('from') else default_start
+        end = date.fromisoformat(request.args['to']) if request.args.get('to') else default_end
+    except ValueError:
+        return None, None
+    return start, end
+
+
+def _sales_dict(row):
+    return {name: getattr(row, name) for name in COUNTERS}
+
+
+# --- ROUTES ---
+# GET /api/analytics/restaurants/3?from=2024-05-01&to=2024-06-01 -> one row per day + totals
+@analytics_bp.route('/restaurants/<int:restaurant_id>', methods=['GET'])
+def restaurant_sales(restaurant_id):
+    start, end = _date_range()
+    if start is None:
+        return jsonify({"error": "from / to must be ISO dates (e.g. 2024-05-01)"}), 400
+
+    if not db.session.execute(db.select(Restaurant.id).where(Restaurant.id == restaurant_id)).first():
+        return jsonify({"error": "Restaurant not found"}), 404
+
+    # 1. The daily rows: a primary key range scan on (restaurant_id, day)
+    rows = db.session.execute(
+        sales_query(start, end)
+        .where(RestaurantDailySales.restaurant_id == restaurant_id)
+        .order_by(RestaurantDailySales.day)
+    ).scalars().all()
+
+    # 2. Totals for the whole range, added up here (no second query)
+    totals = {name: 0 for name in COUNTERS}
+    days = []
+    for row in rows:
+        day = _sales_dict(row)
+        for name in COUNTERS:
+            totals[name] += day[name]
+        day["day"] = row.day
+        days.append(day)
+
+    return jsonify({
+        "restaurant_id": restaurant_id,
+        "from": start,
+        "to": end,
+        "totals": totals,
+        "days": days
+    }), 200
+
+
+# GET /api/analytics/restaurants?from=...&to=...&limit=10 -> best selling restaurants in the range
+@analytics_bp.route('/restaurants', methods=['GET'])
+def top_restaurants():
+    start, end = _date_range()
+    if start is None:
+        return jsonify({"error": "from / to must be ISO dates (e.g. 2024-05-01)"}), 400
+    limit = max(1, min(request.args.get('limit', 10, type=int), 100))
+
+    sums = [db.func.sum(getattr(RestaurantDailySales, name)).label(name) for name in COUNTERS]
+    query = (
+        db.select(RestaurantDailySales.restaurant_id, Restaurant.name, *sums)
+        .join(Restaurant, Restaurant.id == RestaurantDailySales.restaurant_id)
+        .where(RestaurantDailySales.day >= start, RestaurantDailySales.day < end)
+        .group_by(RestaurantDailySales.restaurant_id, Restaurant.name)
+        .order_by(db.desc('revenue'))
+        .limit(limit)
+    )
+    restaurants = [
+        {"restaurant_id": row.restaurant_id, "name": row.name, **_sales_dict(row)}
+        for row in db.session.execute(query)
+    ]
+
+    return jsonify({"from": start, "to": end, "restaurants": restaurants}), 200
@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify
 from app.extensions import db
 from app.models import User
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity 
+from app.identity import user_claims
+from flask_jwt_extended import create_access_token, jwt_required, current_user
 # For creating JWT tokens and protecting routes
 
 
@@ -23,12 +24,12 @@ def register():
     if not username or not email or not password:
         return jsonify({"error": "Missing required fields"}), 400
 
-    # 4. Check for existing users
-    # (Clean Code Tip: Check logic separately for better error messages)
-    if User.query.filter_by(username=username).first():
+    # 4. Check for existing users (one query for both, then tell them which one clashed)
+    existing = User.query.filter(db.or_(User.username == username, User.email == email)).all()
+    if any(user.username == username for user in existing):
         return jsonify({"error": "Username already taken"}), 409 # 409 = Conflict
     
-    if User.query.filter_by(email=email).first():
+    if existing:
         return jsonify({"error": "Email already registered"}), 409
 
     # 5. Create and Save
@@ -55,10 +56,17 @@ def login():
     user = User.query.filter_by(email=email).first()
 
     # 2. check if user exists and password is correct
-    if user and user.check_password(password):
+    # (check_password runs in the hashing pool and may raise a 429 if it is full)
+    if user and password and user.check_password(password):
+        # Hash made with an old cost setting? We have the plain password right now, so upgrade it.
+        if user.password_needs_rehash():
+            user.set_password(password)
+            db.session.commit()
+
         # 3. create the token
         # identity=user.id means "This token belongs to user #5"
-        access_token = create_access_token(identity=str(user.id))
+        # additional_claims puts non-sensitive info (username) inside the token itself
+        access_token = create_access_token(identity=str(user.id), additional_claims=user_claims(user))
 
         return jsonify({
             "message":"Login Successfully",
@@ -75,20 +83,14 @@ def login():
 # The Bouner (Blocks request if no token or invalid token)
 @jwt_required() # This decorator protects the route, only allowing access with a valid JWT token
 def get_current_user():
-    # 1. Get the user ID from the token
-    current_user_id = get_jwt_identity()
-
-    # 2. Fetch the user from the database
-    user = User.query.get(current_user_id)
-
-    if not user:
-        return jsonify({"error": "User not found"}), 404
+    # 1. The user's profile was already loaded for us from the token
+    # (see app/identity.py: it usually comes from a per-worker cache, not the database)
+    user = current_user
     
-    # 3. Return the data
+    # 2. Return the data
     return jsonify({
-        "id": user.id,
-        "username": user.username,
-        "email": user.email,
-        "joined_at": user.created_at.isoformat()
+        "id": user["id"],
+        "username": user["username"],
+        "email": user["email"],
+        "joined_at": user["created_at"]
     }), 200
-
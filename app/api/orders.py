@@ -1,13 +1,25 @@
 # app/api/orders.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context, abort
 from app.extensions import db
 from app.models import Order, OrderItem, MenuItem, Restaurant
+from app.serialization import order_dict, order_item_dict
+from app.exports import FORMATS, parse_datetime, export_orders
+from app.analytics import record_order_placed, record_status_changes
+from app.order_status import STATUSES, change_status, explain_skipped, sources_for, transitions_for
+from app.events import order_events, order_event
+from app.idempotency import idempotent
+from app.pagination import get_limit, wants_total, encode_cursor, decode_cursor, cursor_int
 from flask_jwt_extended import jwt_required, get_jwt_identity
+import time
+from datetime import datetime
+from werkzeug.exceptions import BadRequest
 
 orders_bp = Blueprint('orders', __name__)
 
+# Send an Idempotency-Key header to make retries safe: the same key never places a second order
 @orders_bp.route('/', methods=['POST'])
 @jwt_required()
+@idempotent
 def place_order():
     # 1. Get User
     current_user_id = get_jwt_identity()
@@ -22,58 +34,82 @@ def place_order():
 
     # 3. Validation: Does Restaurant Exist?
     restaurant = Restaurant.query.get_or_404(restaurant_id)
-    
-    # --- CALCULATE & BUILD ---
-    total_price = 0
-    order_items_objects = []
 
+    # 4. Merge duplicate lines (two lines of the same burger = one line with qty 2)
+    quantities = {}
     for item in items_data:
-        # Fetch the real food item from DB
-        menu_item = MenuItem.query.get(item['menu_item_id'])
-        
+        try:
+            menu_item_id = int(item['menu_item_id'])
+            qty = int(item['quantity'])
+        except (KeyError, TypeError, ValueError):
+            return jsonify({"error": "Each item needs a menu_item_id and a quantity"}), 400
+        if qty < 1:
+            return jsonify({"error": "Quantity must be positive"}), 400
+        quantities[menu_item_id] = quantities.get(menu_item_id, 0) + qty
+
+    # 5. Fetch ALL requested menu items with ONE query: ... WHERE id IN (1, 2, 3)
+    # (Instead of one MenuItem.query.get() per line in the cart)
+    menu_items = db.session.execute(
+        db.select(MenuItem.id, MenuItem.name, MenuItem.price, MenuItem.restaurant_id, MenuItem.is_active)
+        .where(MenuItem.id.in_(quantities.keys()))
+    ).all()
+    menu_by_id = {row.id: row for row in menu_items}
+
+    # --- CALCULATE & BUILD (one pass, no more database work) ---
+    total_price = 0
+    order_item_rows = []
+
+    for menu_item_id, qty in quantities.items():
+        menu_item = menu_by_id.get(menu_item_id)
+
         if not menu_item:
-            return jsonify({"error": f"Item {item['menu_item_id']} not found"}), 404
-            
+            return jsonify({"error": f"Item {menu_item_id} not found"}), 404
+
         # Security Check: Don't let them order a Pizza from a Burger King order
         if menu_item.restaurant_id != restaurant.id:
             return jsonify({"error": "Item does not belong to this restaurant"}), 400
 
-        # Calculate Cost
-        qty = item['quantity']
-        if qty < 1:
-            return jsonify({"error": "Quantity must be positive"}), 400
-            
-        item_total = menu_item.price * qty
-        total_price += item_total
-        
-        # Create the Snapshot (The Receipt Line)
-        order_item = OrderItem(
-            menu_item_id=menu_item.id,
-            price_at_order=menu_item.price, # FREEZING THE PRICE
-            quantity=qty,
-            item_name=menu_item.name
-        )
-        order_items_objects.append(order_item)
-
-    # 4. Create the Order Header
+        # Soft-deleted items can't be ordered any more
+        if menu_item.is_active is False:
+            return jsonify({"error": f"Item {menu_item_id} is no longer available"}), 400
+
+        total_price += menu_item.price * qty
+
+        # Create the Snapshot (The Receipt Line) as a plain dict for the bulk insert
+        order_item_rows.append({
+            "menu_item_id": menu_item.id,
+            "price_at_order": menu_item.price, # FREEZING THE PRICE
+            "quantity": qty,
+            "item_name": menu_item.name
+        })
+
+    # 6. Create the Order Header
     new_order = Order(
         user_id=current_user_id,
         restaurant_id=restaurant.id,
         total_price=total_price,
-        status='pending'
+        status='pending',
+        version=1
     )
-    
-    # 5. Link Items to Order
+
+    # 7. Link Items to Order
     # We add the order to the session first so it gets an ID
     db.session.add(new_order)
     db.session.flush() # This generates the ID for new_order without committing yet
-    
-    for obj in order_items_objects:
-        obj.order_id = new_order.id # Link them
-        db.session.add(obj)
-        
-    # 6. Final Commit (Atomic Transaction)
+
+    for row in order_item_rows:
+        row["order_id"] = new_order.id # Link them
+
+    # One executemany INSERT for every line, however big the cart is
+    db.session.execute(db.insert(OrderItem), order_item_rows)
+
+    # Add the order to its restaurant's sales for today (same transaction, see app/analytics.py)
+    record_order_placed(new_order)
+
+    # 8. Final Commit (Atomic Transaction), then tell the customer's open screens about it
+    event = order_event(new_order)
     db.session.commit()
+    order_events.publish(current_user_id, event)
     
     return jsonify({
         "message": "Order placed successfully", 
@@ -82,58 +118,312 @@ def place_order():
     }), 201
 
 
+def _items_for(order_ids):
+    # Load the line items of MANY orders with ONE query (instead of order.items per order)
+    items = {order_id: [] for order_id in order_ids}
+    if not order_ids:
+        return items
+
+    rows = db.session.execute(
+        db.select(OrderItem.order_id, OrderItem.item_name, OrderItem.quantity, OrderItem.price_at_order)
+        .where(OrderItem.order_id.in_(order_ids))
+        .order_by(OrderItem.id)
+    )
+    for row in rows:
+        items[row.order_id].append(order_item_dict(row))
+    return items
+
+
+# Order history is always paged: GET /api/orders?limit=20&cursor=...
+# Add ?summary=1 to leave out the line items (no second query at all).
 @orders_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_user_orders():
     current_user_id = get_jwt_identity()
-    
-    # 1. Fetch Orders for THIS user only
-    # order_by(desc) puts the newest orders at the top
-    orders = Order.query.filter_by(user_id=current_user_id)\
-        .order_by(Order.created_at.desc()).all()
-    
-    data = []
-    
-    for order in orders:
-        # 2. Build the "Inner" List (The Items)
-        items_data = []
-        for item in order.items:
-            items_data.append({
-                "name": item.item_name,
-                "quantity": item.quantity,
-                "price": str(item.price_at_order)
-            })
-            
-        # 3. Build the "Outer" Object (The Order)
-        data.append({
-            "id": order.id,
-            "restaurant_id": order.restaurant_id,
-            "status": order.status,
-            "total_price": str(order.total_price),
-            "date": order.created_at.isoformat(),
-            "items": items_data # <--- Nesting the list here
-        })
-        
-    return jsonify(data), 200
+    limit = get_limit()
+    cursor = decode_cursor(request.args.get('cursor'))
+    summary = request.args.get('summary', '').lower() in ('1', 'true', 'yes')
+
+    # 1. Fetch ONE page of orders for THIS user only, newest first.
+    # The cursor is the (created_at, id) of the last order on the previous page, and the
+    # composite index on (user_id, created_at, id) lets the database seek straight to it,
+    # so page 500 costs the same as page 1.
+    # Only the columns order_dict() needs are selected, so we get light rows instead of Order objects.
+    query = db.select(Order.id, Order.restaurant_id, Order.status, Order.version, Order.total_price, Order.created_at)\
+        .where(Order.user_id == current_user_id)\
+        .order_by(Order.created_at.desc(), Order.id.desc())
+    if cursor:
+        try:
+            last_created_at = datetime.fromisoformat(cursor['created_at'])
+        except (KeyError, TypeError, ValueError):
+            raise BadRequest('Invalid cursor')
+        last_id = cursor_int(cursor, 'id', 0)
+        query = query.where(db.or_(
+            Order.created_at < last_created_at,
+            db.and_(Order.created_at == last_created_at, Order.id < last_id)
+        ))
+
+    orders = db.session.execute(query.limit(limit + 1)).all()
+    has_more = len(orders) > limit
+    orders = orders[:limit]
+
+    # 2. Build the "Inner" Lists (The Items) for the whole page in one go
+    if summary:
+        data = [order_dict(order) for order in orders]
+    else:
+        items = _items_for([order.id for order in orders])
+        data = [order_dict(order, items[order.id]) for order in orders]
 
+    # 3. Return Metadata (So the client knows how to ask for the next page)
+    meta = {"limit": limit, "next_cursor": None}
+    if has_more:
+        last = orders[-1]
+        meta["next_cursor"] = encode_cursor({"created_at": last.created_at.isoformat(), "id": last.id})
+    if wants_total():
+        meta["total_items"] = Order.query.filter_by(user_id=current_user_id).count()
+
+    return jsonify({"orders": data, "meta": meta}), 200
+
+
+# Streaming export for reporting jobs:
+# GET /api/orders/export?from=2024-05-01&to=2024-06-01&restaurant_id=3&format=ndjson|csv
+# Users listed in REPORTING_USER_IDS export every order; everyone else only their own.
+@orders_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_user_orders():
+    # 1. Read the filters
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in FORMATS:
+        return jsonify({"error": f"format must be one of: {', '.join(FORMATS)}"}), 400
+    try:
+        start = parse_datetime(request.args.get('from'))
+        end = parse_datetime(request.args.get('to'))
+    except ValueError:
+        return jsonify({"error": "from / to must be ISO dates (e.g. 2024-05-01)"}), 400
+    restaurant_id = request.args.get('restaurant_id', type=int)
+
+    # 2. Who may see what
+    current_user_id = get_jwt_identity()
+    user_id = None if current_user_id in current_app.config['REPORTING_USER_IDS'] else current_user_id
+
+    # 3. Stream it: the generator runs while the response is being sent,
+    # stream_with_context keeps the app (and database session) alive until it is done
+    chunks = export_orders(
+        fmt, current_app.json.dumps, batch_size=current_app.config['EXPORT_BATCH_SIZE'],
+        start=start, end=end, restaurant_id=restaurant_id, user_id=user_id,
+    )
+    return Response(stream_with_context(chunks), mimetype=FORMATS[fmt],
+                    headers={"Content-Disposition": f'attachment; filename="orders.{fmt}"'})
+
+
+def _managed_user_id():
+    # Whose orders may the caller change? None = every order (staff, ORDER_STAFF_USER_IDS),
+    # otherwise only their own
+    current_user_id = get_jwt_identity()
+    return None if current_user_id in current_app.config['ORDER_STAFF_USER_IDS'] else current_user_id
 
+
+def _forbidden_status(user_id, new_status):
+    # Customers may only cancel (see CUSTOMER_TRANSITIONS in app/order_status.py)
+    if not sources_for(new_status, transitions_for(user_id)):
+        return jsonify({"error": f"Only staff can set an order to {new_status}"}), 403
+    return None
+
+
+# PATCH /api/orders/5/status  {"status": "preparing", "version": 1}
+# "version" is optional: send the one you last saw and the update only happens if nobody
+# changed the order since (otherwise 409 with the current status and version).
+# Staff may change any order, everyone else only cancel their own pending ones
+# (other orders are a 404, other statuses a 403).
 @orders_bp.route('/<int:order_id>/status', methods=['PATCH'])
 @jwt_required()
 def update_order_status(order_id):
     # 1. Get the Data
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     new_status = data.get('status')
-    
-    valid_statuses = ['pending', 'preparing', 'delivered', 'cancelled']
-    
-    if new_status not in valid_statuses:
+    version = data.get('version')
+
+    if new_status not in STATUSES:
         return jsonify({"error": "Invalid status"}), 400
+    if version is not None and (not isinstance(version, int) or isinstance(version, bool)):
+        return jsonify({"error": "version must be an integer"}), 400
 
-    # 2. Find the Order
-    order = Order.query.get_or_404(order_id)
-    
-    # 3. Update & Save
-    order.status = new_status
+    # 2. ONE conditional UPDATE (no need to load the order first)
+    user_id = _managed_user_id()
+    forbidden = _forbidden_status(user_id, new_status)
+    if forbidden:
+        return forbidden
+    versions = {order_id: version} if version is not None else None
+    rows = change_status(new_status, ids=[] if versions else [order_id], versions=versions, user_id=user_id)
+
+    if not rows:
+        # Nothing matched: find out why (missing or someone else's order, forbidden move or a concurrent change)
+        db.session.rollback()
+        reason = explain_skipped([order_id], new_status, versions, user_id=user_id)[order_id]
+        if reason["error"] == "Order not found":
+            abort(404)
+        return jsonify(reason), 409
+
+    # 3. Move it into the delivered / cancelled sales figures and save.
+    # (An order can only LEAVE pending or preparing, which have no sales columns: old status = None)
+    record_status_changes(rows, None, new_status)
     db.session.commit()
-    
-    return jsonify({"message": f"Order status updated to {new_status}"}), 200
\ No newline at end of file
+
+    # 4. Push the change to the customer (see GET /api/orders/events)
+    order = rows[0]
+    order_events.publish(order.user_id, order_event(order))
+
+    return jsonify({
+        "message": f"Order status updated to {new_status}",
+        "id": order.id,
+        "status": order.status,
+        "version": order.version
+    }), 200
+
+
+# POST /api/orders/status/bulk
+# {"status": "preparing", "restaurant_id": 3, "orders": [12, 13, {"id": 14, "version": 2}]}
+# Moves every listed order that is allowed to move in ONE UPDATE. Orders that can't move
+# (wrong status, changed by someone else, not found) are listed under "skipped" with the reason.
+# Only staff (ORDER_STAFF_USER_IDS) can move other users' orders; for everyone else those
+# are "not found" like ids that don't exist, and the only allowed status is "cancelled" (403).
+MAX_BULK_ORDERS = 1000
+
+
+@orders_bp.route('/status/bulk', methods=['POST'])
+@jwt_required()
+def bulk_update_order_status():
+    # 1. Validate the request
+    data = request.get_json(silent=True) or {}
+    new_status = data.get('status')
+    orders = data.get('orders')
+    restaurant_id = data.get('restaurant_id')
+
+    if new_status not in STATUSES:
+        return jsonify({"error": "Invalid status"}), 400
+    if not isinstance(orders, list) or not orders:
+        return jsonify({"error": "'orders' must be a non-empty list"}), 400
+    if len(orders) > MAX_BULK_ORDERS:
+        return jsonify({"error": f"At most {MAX_BULK_ORDERS} orders per request"}), 400
+    if restaurant_id is not None and not isinstance(restaurant_id, int):
+        return jsonify({"error": "restaurant_id must be an integer"}), 400
+
+    ids, versions = set(), {}
+    for entry in orders:
+        if isinstance(entry, dict):
+            order_id, version = entry.get('id'), entry.get('version')
+        else:
+            order_id, version = entry, None
+        if not isinstance(order_id, int) or isinstance(order_id, bool) or order_id in ids or order_id in versions:
+            return jsonify({"error": "Each order must be a unique integer id or {\"id\": ..., \"version\": ...}"}), 400
+        if version is None:
+            ids.add(order_id)
+        elif isinstance(version, int) and not isinstance(version, bool):
+            versions[order_id] = version
+        else:
+            return jsonify({"error": "version must be an integer"}), 400
+
+    # 2. ONE conditional UPDATE for the whole batch, then the sales figures in one statement
+    user_id = _managed_user_id()
+    forbidden = _forbidden_status(user_id, new_status)
+    if forbidden:
+        return forbidden
+    rows = change_status(new_status, ids=ids, versions=versions, restaurant_id=restaurant_id, user_id=user_id)
+    record_status_changes(rows, None, new_status) # pending / preparing have no sales columns
+    db.session.commit()
+
+    # 3. Tell every customer, and explain what was skipped (one more query, only if needed)
+    for row in rows:
+        order_events.publish(row.user_id, order_event(row))
+
+    updated_ids = {row.id for row in rows}
+    skipped_ids = [order_id for order_id in list(ids) + list(versions) if order_id not in updated_ids]
+    skipped = explain_skipped(skipped_ids, new_status, versions, restaurant_id, user_id) if skipped_ids else {}
+
+    return jsonify({
+        "updated": [{"id": row.id, "status": row.status, "version": row.version} for row in rows],
+        "skipped": [skipped[order_id] for order_id in skipped_ids]
+    }), 200
+
+
+# --- ORDER EVENTS (instead of polling GET /api/orders/) ---
+# EventSource (the browser's SSE client) can't send headers, so these two routes also
+# accept the token as ?jwt=<token>.
+def _last_event_id():
+    return request.args.get('after') or request.headers.get('Last-Event-ID')
+
+
+# Long-poll: GET /api/orders/events?after=<last_event_id>
+# Answers as soon as there is an event newer than `after`, or with an empty list after ~25s.
+# The first call (no `after`) answers at once with the id to continue from.
+# Where requests can't wait (sync workers, see app/events.py) it always answers at once, with
+# "poll_after": the seconds to wait before the next call.
+@orders_bp.route('/events', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def wait_for_order_events():
+    current_user_id = get_jwt_identity()
+    after = _last_event_id()
+    if not after:
+        return jsonify({"events": [], "last_event_id": order_events.latest_id(current_user_id)}), 200
+
+    can_wait = order_events.can_hold_connections()
+    max_timeout = current_app.config['ORDER_EVENTS_POLL_TIMEOUT'] if can_wait else 0
+    timeout = max(0, min(request.args.get('timeout', max_timeout, type=float), max_timeout))
+
+    # Give the database connection back to the pool before waiting (nothing below needs it)
+    db.session.remove()
+    events = order_events.wait(current_user_id, after, timeout)
+
+    response = {
+        "events": [dict(event, id=event_id) for event_id, event in events],
+        "last_event_id": events[-1][0] if events else after
+    }
+    if not can_wait:
+        response["poll_after"] = current_app.config['ORDER_EVENTS_POLL_INTERVAL']
+    return jsonify(response), 200
+
+
+# Server-Sent Events: GET /api/orders/events/stream (new EventSource(url + '?jwt=' + token))
+# One long response that sends every event as it happens, plus a keep-alive comment now and then.
+# Where requests can't wait (sync workers, see app/events.py) the stream sends what is new and
+# ends at once; EventSource reconnects after ORDER_EVENTS_POLL_INTERVAL with Last-Event-ID.
+@orders_bp.route('/events/stream', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def stream_order_events():
+    current_user_id = get_jwt_identity()
+    after = _last_event_id() or order_events.latest_id(current_user_id)
+
+    # The generator runs after this function returned: take what it needs from the app now
+    broker = order_events.broker
+    dumps = current_app.json.dumps
+    heartbeat = current_app.config['ORDER_EVENTS_HEARTBEAT']
+    if order_events.can_hold_connections():
+        max_age, retry_ms = current_app.config['ORDER_EVENTS_STREAM_MAX_AGE'], 3000
+    else:
+        max_age, retry_ms = 0, current_app.config['ORDER_EVENTS_POLL_INTERVAL'] * 1000
+    db.session.remove()
+
+    def generate(after):
+        yield f"retry: {retry_ms}\n\n" # How long EventSource waits before reconnecting when the stream ends
+        events = broker.wait(current_user_id, after, 0) # Whatever happened since the last connection
+        for event_id, event in events:
+            yield f"id: {event_id}\nevent: order\ndata: {dumps(event)}\n\n"
+        if events:
+            after = events[-1][0]
+        deadline = time.monotonic() + max_age
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            events = broker.wait(current_user_id, after, min(heartbeat, remaining))
+            if not events:
+                yield ": keep-alive\n\n" # Keeps proxies from closing an idle connection
+                continue
+            for event_id, event in events:
+                yield f"id: {event_id}\nevent: order\ndata: {dumps(event)}\n\n"
+            after = events[-1][0]
+
+    return Response(generate(after), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no" # Tell nginx not to buffer the stream
+    })
@@ -0,0 +1,41 @@
+# app/api/system.py
+# Operational numbers (cache, load, metrics). They show how busy the site is and which routes are
+# hit, so only users listed in REPORTING_USER_IDS may read them; set SYSTEM_ENDPOINTS_PUBLIC=true
+# where only a trusted network (e.g. a Prometheus scraper without a token) can reach /api/system.
+from flask import Blueprint, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.cache import cache
+from app.instrumentation import render_metrics
+from app.ratelimit import rate_limiter
+
+system_bp = Blueprint('system', __name__)
+
+
+@system_bp.before_request
+def reporting_users_only():
+    if current_app.config['SYSTEM_ENDPOINTS_PUBLIC']:
+        return None
+    return _require_reporting_user()
+
+
+@jwt_required()
+def _require_reporting_user():
+    if get_jwt_identity() not in current_app.config['REPORTING_USER_IDS']:
+        return jsonify({"error": "Reporting access required"}), 403
+
+# GET /api/system/cache -> hit/miss/eviction counters, used to size the cache
+@system_bp.route('/cache', methods=['GET'])
+def cache_stats():
+    return jsonify(cache.stats()), 200
+
+
+# GET /api/system/load -> requests in progress in this worker and how many were shed
+@system_bp.route('/load', methods=['GET'])
+def load_stats():
+    return jsonify(rate_limiter.stats()), 200
+
+
+# GET /api/system/metrics -> request/SQL histograms in Prometheus text format (scraped by Prometheus)
+@system_bp.route('/metrics', methods=['GET'])
+def metrics():
+    return render_metrics(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
@@ -0,0 +1,250 @@
+"""
+A small read-through cache for data that is read far more often than it is written
+(restaurant pages, menus, ...).
+
+Two backends share the same interface:
+- MemoryBackend: an in-process LRU with a TTL per entry and a maximum size.
+  Each gunicorn worker has its own copy, and a write only invalidates the copy of the
+  worker that handled it (or none at all, for the CLI). So its entries live only
+  CACHE_MEMORY_TTL seconds (default 5): with several workers, use redis.
+- RedisBackend: one cache shared by every worker (needs the optional `redis` package).
+
+Besides plain keys, the cache keeps "namespace versions". A group of keys that
+can't be invalidated one by one (e.g. every page of the restaurant listing)
+puts the version in its keys; bumping the version makes all of them unreachable at once.
+"""
+
+# app/cache.py
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app
+
+
+class MemoryBackend:
+    def __init__(self, max_entries=2048, default_ttl=300, max_ttl=None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.max_ttl = max_ttl # Caps the ttl passed to set() too
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (expires_at, value), oldest first
+        self._versions = {}             # namespace -> int (never evicted)
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key) # Mark as "recently used"
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl or self.default_ttl
+        if self.max_ttl is not None:
+            ttl = min(ttl, self.max_ttl)
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            # Too big? Throw away the least recently used entries
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    def version(self, namespace):
+        with self._lock:
+            return self._versions.get(namespace, 0)
+
+    def bump(self, namespace):
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "memory",
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class RedisBackend:
+    def __init__(self, url, default_ttl=300, prefix="zomighty:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis needs the 'redis' package (pip install redis)")
+
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def _key(self, key):
+        return self.prefix + key
+
+    def get(self, key):
+        value = self._client.get(self._key(key))
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(value)
+
+    def set(self, key, value, ttl=None):
+        # JSON, never pickle: whoever can write to this Redis must not be able to run code in the workers
+        self._client.set(self._key(key), json.dumps(value), ex=ttl or self.default_ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self._client.delete(*[self._key(key) for key in keys])
+
+    def clear(self):
+        keys = list(self._client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self._client.delete(*keys)
+
+    def version(self, namespace):
+        return int(self._client.get(self._key("version:" + namespace)) or 0)
+
+    def bump(self, namespace):
+        self._client.incr(self._key("version:" + namespace))
+
+    def stats(self):
+        # Evictions happen inside Redis, so ask it (counted server-wide, not just our keys)
+        evictions = self._client.info("stats").get("evicted_keys")
+        with self._lock:
+            return {"backend": "redis", "hits": self.hits, "misses": self.misses, "evictions": evictions}
+
+
+class NullBackend:
+    """Caching switched off (CACHE_BACKEND=none): every read is a miss."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def clear(self):
+        pass
+
+    def version(self, namespace):
+        return 0
+
+    def bump(self, namespace):
+        pass
+
+    def stats(self):
+        return {"backend": "none"}
+
+
+class Cache:
+    """The object the rest of the app talks to; the backend is chosen from the config."""
+
+    def init_app(self, app):
+        backend = app.config.get("CACHE_BACKEND", "memory")
+        ttl = app.config.get("CACHE_DEFAULT_TTL", 300)
+
+        if backend == "memory":
+            # Other workers' writes don't reach this copy: keep its entries short-lived
+            ttl = min(ttl, app.config.get("CACHE_MEMORY_TTL", 5))
+            app.extensions["cache"] = MemoryBackend(app.config.get("CACHE_MAX_ENTRIES", 2048), ttl, max_ttl=ttl)
+        elif backend == "redis":
+            app.extensions["cache"] = RedisBackend(app.config["CACHE_REDIS_URL"], ttl)
+        elif backend == "none":
+            app.extensions["cache"] = NullBackend()
+        else:
+            raise RuntimeError(f"Unknown CACHE_BACKEND: {backend}")
+
+    @property
+    def backend(self):
+        return current_app.extensions["cache"]
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.backend.set(key, value, ttl)
+
+    def delete(self, *keys):
+        self.backend.delete(*keys)
+
+    def clear(self):
+        self.backend.clear()
+
+    def version(self, namespace):
+        return self.backend.version(namespace)
+
+    def bump(self, namespace):
+        self.backend.bump(namespace)
+
+    def stats(self):
+        return self.backend.stats()
+
+    def cached(self, make_key, ttl=None):
+        """
+        Decorator for JSON views: the serialized body of a 200 response (plus its
+        ETag / Last-Modified validators) is stored under make_key(**view_args), and
+        later requests are answered from it without running the view
+        (no database, no serialization).
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                key = make_key(*args, **kwargs)
+                entry = self.get(key)
+                if entry is not None:
+                    response = current_app.response_class(entry["body"], mimetype="application/json")
+                    response.set_etag(entry["etag"])
+                    if entry["last_modified"]:
+                        response.headers["Last-Modified"] = entry["last_modified"]
+                    return response
+
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code == 200:
+                    if not response.get_etag()[0]:
+                        response.add_etag() # No validator from the view -> hash of the body
+                    # Only strings: the Redis backend stores entries as JSON
+                    self.set(key, {
+                        "body": response.get_data(as_text=True),
+                        "etag": response.get_etag()[0],
+                        "last_modified": response.headers.get("Last-Modified"),
+                    }, ttl)
+                return response
+            return wrapper
+        return decorator
+
+
+cache = Cache()
@@ -0,0 +1,296 @@
+"""
+Command line tools, registered on the app by create_app().
+
+    flask --app run catalog import --restaurants restaurants.csv --menu-items menu_items.jsonl
+    flask --app run orders export --from 2024-05-01 --to 2024-06-01 --format csv -o may.csv
+    flask --app run analytics backfill --from 2024-01-01
+    flask --app run db upgrade
+    flask --app run frontend build
+
+Files can be CSV (with a header row) or JSON Lines (.jsonl / .ndjson, one object per line).
+They are streamed row by row and written in large executemany batches, so memory use does
+not depend on the file size. Rows carry their own IDs and are upserted, which makes
+re-importing the same (or an updated) file safe.
+
+    restaurants: id, name, address, description, image_url [, latitude, longitude, delivery_radius_km]
+    menu items:  id, restaurant_id, name, price, description, is_active
+
+`orders export` streams orders (see app/exports.py) to a file or stdout.
+`analytics backfill` rebuilds the daily sales rollups (see app/analytics.py) from the orders.
+`db upgrade` applies the schema migrations in app/migrations.
+`frontend build` hashes and precompresses frontend/ for serving (see app/frontend.py).
+"""
+
+# app/cli.py
+import csv
+import json
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from app import analytics, geo, migrations
+from app.api.restaurants import MAX_PRICE
+from app.cache import cache
+from app.database import advance_id_sequence, upsert
+from app.exports import FORMATS, parse_datetime, export_orders
+from app.extensions import db
+from app.frontend import build_frontend
+from app.models import Restaurant, MenuItem
+from app.search import search_index
+
+catalog_cli = AppGroup('catalog', help='Bulk catalog (restaurants & menus) tools.')
+orders_cli = AppGroup('orders', help='Order reporting tools.')
+analytics_cli = AppGroup('analytics', help='Sales rollup tools.')
+db_cli = AppGroup('db', help='Database schema migrations.')
+frontend_cli = AppGroup('frontend', help='Static frontend build.')
+
+
+def read_records(path):
+    # Yields one dict per row, without ever loading the whole file
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith(('.jsonl', '.ndjson')):
+            for line_number, line in enumerate(f, start=1):
+                if line.strip():
+                    try:
+                        yield line_number, json.loads(line)
+                    except ValueError:
+                        raise click.ClickException(f"{path}:{line_number}: invalid JSON")
+        elif path.endswith('.csv'):
+            for line_number, row in enumerate(csv.DictReader(f), start=2):
+                yield line_number, row
+        else:
+            raise click.ClickException(f"{path}: expected a .csv, .jsonl or .ndjson file")
+
+
+def _required(record, field, path, line_number):
+    value = record.get(field)
+    if value is None or value == '':
+        raise click.ClickException(f"{path}:{line_number}: missing '{field}'")
+    return value
+
+
+def _as_int(value, field, path, line_number):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise click.ClickException(f"{path}:{line_number}: '{field}' must be an integer")
+
+
+def _as_float(value, field, path, line_number):
+    # Empty means "not given"
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise click.ClickException(f"{path}:{line_number}: '{field}' must be a number")
+
+
+def restaurant_rows(path):
+    now = datetime.utcnow()
+    for line_number, record in read_records(path):
+        latitude = _as_float(record.get('latitude'), 'latitude', path, line_number)
+        longitude = _as_float(record.get('longitude'), 'longitude', path, line_number)
+        if (latitude is not None or longitude is not None) and not geo.valid_coordinates(latitude, longitude):
+            raise click.ClickException(f"{path}:{line_number}: latitude/longitude are missing or out of range")
+        yield {
+            "id": _as_int(_required(record, 'id', path, line_number), 'id', path, line_number),
+            "name": _required(record, 'name', path, line_number),
+            "address": _required(record, 'address', path, line_number),
+            "description": record.get('description') or None,
+            "image_url": record.get('image_url') or None,
+            "latitude": latitude,
+            "longitude": longitude,
+            "geohash": geo.encode(latitude, longitude) if latitude is not None else None,
+            "delivery_radius_km": _as_float(record.get('delivery_radius_km'), 'delivery_radius_km', path, line_number),
+            "version": 1,
+            "updated_at": now,
+        }
+
+
+def menu_item_rows(path):
+    now = datetime.utcnow()
+    for line_number, record in read_records(path):
+        try:
+            price = Decimal(str(_required(record, 'price', path, line_number)))
+        except InvalidOperation:
+            raise click.ClickException(f"{path}:{line_number}: 'price' must be a number")
+        if not price.is_finite() or not 0 < price <= MAX_PRICE:
+            raise click.ClickException(f"{path}:{line_number}: 'price' must be a positive number up to {MAX_PRICE}")
+        is_active = record.get('is_active', True)
+        if isinstance(is_active, str):
+            is_active = is_active.strip().lower() not in ('0', 'false', 'no', '')
+        yield {
+            "id": _as_int(_required(record, 'id', path, line_number), 'id', path, line_number),
+            "restaurant_id": _as_int(_required(record, 'restaurant_id', path, line_number), 'restaurant_id', path, line_number),
+            "name": _required(record, 'name', path, line_number),
+            "description": record.get('description') or None,
+            "price": price,
+            "is_active": bool(is_active),
+            "updated_at": now,
+        }
+
+
+def import_rows(table, rows, batch_size, update_columns, increment_columns=(), before_batch=None):
+    # Upsert in batches; each batch is its own transaction so a huge file never holds one giant lock.
+    # before_batch(connection, batch) runs first, in the same transaction (it can still see the old rows).
+    total = 0
+    batch = []
+
+    def flush():
+        with db.engine.begin() as connection:
+            if before_batch:
+                before_batch(connection, batch)
+            upsert(connection, table, batch, update_columns=update_columns, increment_columns=increment_columns)
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            flush()
+            total += len(batch)
+            batch = []
+    if batch:
+        flush()
+        total += len(batch)
+    return total
+
+
+@catalog_cli.command('import')
+@click.option('--restaurants', 'restaurants_path', type=click.Path(exists=True, dir_okay=False),
+              help='CSV / JSON Lines file with restaurants.')
+@click.option('--menu-items', 'menu_items_path', type=click.Path(exists=True, dir_okay=False),
+              help='CSV / JSON Lines file with menu items.')
+@click.option('--batch-size', default=10000, show_default=True, help='Rows per INSERT batch.')
+def import_catalog(restaurants_path, menu_items_path, batch_size):
+    """Stream restaurants and menu items from files into the database (idempotent)."""
+    if not restaurants_path and not menu_items_path:
+        raise click.UsageError('Pass --restaurants and/or --menu-items')
+
+    started = time.perf_counter()
+
+    if restaurants_path:
+        count = import_rows(
+            Restaurant.__table__, restaurant_rows(restaurants_path), batch_size,
+            update_columns=('name', 'address', 'description', 'image_url', 'latitude', 'longitude',
+                            'geohash', 'delivery_radius_km', 'updated_at'),
+            increment_columns=('version',), # Re-imported restaurants get a new version (new ETag)
+        )
+        click.echo(f"Restaurants upserted: {count}")
+
+    if menu_items_path:
+        def bump_versions(connection, batch):
+            # A changed menu is a new version of its restaurant (see the ETags in app/api/restaurants.py).
+            # An item that moves to another restaurant changes BOTH menus: the old restaurant_id is
+            # read before the upsert overwrites it. Every batch bumps again, so a page cached
+            # between two batches can't keep its ETag.
+            item_ids = [row['id'] for row in batch]
+            previous = connection.execute(
+                db.select(MenuItem.restaurant_id).where(MenuItem.id.in_(item_ids)).distinct()
+            ).scalars()
+            ids = {row['restaurant_id'] for row in batch} | set(previous)
+            connection.execute(
+                db.update(Restaurant)
+                .where(Restaurant.id.in_(ids))
+                .values(version=Restaurant.version + 1, updated_at=datetime.utcnow())
+            )
+
+        count = import_rows(
+            MenuItem.__table__, menu_item_rows(menu_items_path), batch_size,
+            update_columns=('restaurant_id', 'name', 'description', 'price', 'is_active', 'updated_at'),
+            before_batch=bump_versions,
+        )
+        click.echo(f"Menu items upserted: {count}")
+
+    # The rows came with their own IDs: make sure new rows created by the API don't collide
+    with db.engine.begin() as connection:
+        if restaurants_path:
+            advance_id_sequence(connection, Restaurant.__table__)
+        if menu_items_path:
+            advance_id_sequence(connection, MenuItem.__table__)
+
+    # Derived data is refreshed once for the whole import instead of once per row.
+    # This command runs in its own process: what it can reach depends on where the data lives.
+    if search_index.backend_name == "memory":
+        # Each worker has its own index; the updated_at bumps above make them reindex these restaurants
+        click.echo(f"Search: running workers pick up the changes within "
+                   f"{current_app.config['SEARCH_REFRESH_INTERVAL']}s")
+    else:
+        search_index.rebuild() # Stored in the database: shared by every worker
+        click.echo("Search index rebuilt")
+
+    cache_backend = current_app.config.get("CACHE_BACKEND", "memory")
+    if cache_backend == "redis":
+        cache.clear() # Shared by every worker
+        click.echo("Response cache cleared")
+    elif cache_backend == "memory":
+        # Each worker's copy can't be reached from here, but its entries live at most CACHE_MEMORY_TTL
+        click.echo(f"Cache: running workers serve the new catalog within "
+                   f"{min(current_app.config['CACHE_DEFAULT_TTL'], current_app.config['CACHE_MEMORY_TTL'])}s")
+
+    click.echo(f"Done in {time.perf_counter() - started:.1f}s")
+
+
+def _datetime_option(ctx, param, value):
+    try:
+        return parse_datetime(value)
+    except ValueError:
+        raise click.BadParameter('expected an ISO date, e.g. 2024-05-01')
+
+
+@orders_cli.command('export')
+@click.option('--from', 'start', callback=_datetime_option, help='Orders created at or after this date.')
+@click.option('--to', 'end', callback=_datetime_option, help='Orders created before this date.')
+@click.option('--restaurant-id', type=int, help='Only this restaurant.')
+@click.option('--format', 'fmt', type=click.Choice(list(FORMATS)), default='ndjson', show_default=True)
+@click.option('--output', '-o', type=click.File('w', encoding='utf-8', lazy=True), default='-',
+              help='File to write (default: stdout).')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows fetched per round trip.')
+def export_orders_command(start, end, restaurant_id, fmt, output, batch_size):
+    """Stream orders and their line items as NDJSON or CSV."""
+    chunks = export_orders(fmt, current_app.json.dumps, batch_size=batch_size,
+                           start=start, end=end, restaurant_id=restaurant_id)
+    for chunk in chunks:
+        output.write(chunk)
+
+
+@analytics_cli.command('backfill')
+@click.option('--from', 'start', type=click.DateTime(['%Y-%m-%d']), help='First day to rebuild (default: all).')
+@click.option('--to', 'end', type=click.DateTime(['%Y-%m-%d']), help='Rebuild up to, not including, this day.')
+def backfill_command(start, end):
+    """Recompute the restaurant daily sales rollups from the orders table."""
+    started = time.perf_counter()
+    count = analytics.backfill(start.date() if start else None, end.date() if end else None)
+    click.echo(f"Rollup rows written: {count} in {time.perf_counter() - started:.1f}s")
+
+
+@db_cli.command('upgrade')
+@click.option('--to', 'target', type=int, help='Stop after this migration number (default: the latest).')
+def upgrade_command(target):
+    """Apply the migrations that haven't run yet."""
+    applied = migrations.upgrade(db.engine, target=target, log=click.echo)
+    click.echo(f"Database is at version {migrations.current_version(db.engine)}"
+               + ("" if applied else " (nothing to do)"))
+
+
+@db_cli.command('current')
+def current_command():
+    """Show the database's migration version and what is still pending."""
+    current = migrations.current_version(db.engine)
+    click.echo(f"Database is at version {current}")
+    for version, name in migrations.discover():
+        if version > current:
+            click.echo(f"  pending: {version:04d}_{name}")
+
+
+@frontend_cli.command('build')
+def build_frontend_command():
+    """Hash and precompress frontend/ into FRONTEND_BUILD_DIR."""
+    source, target = current_app.config['FRONTEND_SOURCE_DIR'], current_app.config['FRONTEND_BUILD_DIR']
+    manifest = build_frontend(source, target)
+    for name, entry in sorted(manifest.items()):
+        click.echo(f"  {entry['file']}: {entry['size']} bytes, precompressed: {', '.join(entry['encodings']) or 'none'}")
+    click.echo(f"Built {len(manifest)} files into {target}")
@@ -0,0 +1,89 @@
+"""
+Compressed JSON responses.
+
+Restaurant listings and order histories are mostly repeated keys and similar values,
+so they shrink 5-10x with gzip. init_compression(app) adds an after_request hook that,
+for 200 JSON responses of at least COMPRESS_MIN_SIZE bytes:
+1. picks an encoding the client accepts (Accept-Encoding): brotli when the optional
+   `brotli` package is installed, gzip otherwise,
+2. compresses the body and sets Content-Encoding / Vary: Accept-Encoding,
+3. turns the ETag into a weak one (W/"..."): same content, different bytes. Conditional
+   requests still get their 304, If-None-Match uses the weak comparison.
+
+Catalog responses carry an ETag that changes whenever their content does, so their compressed
+bodies are kept in a small per-worker LRU keyed by (encoding, endpoint, ETag): a popular page
+is compressed once, not on every hit. Responses without an ETag (e.g. a user's orders)
+are compressed every time and never stored.
+
+Streamed responses (exports, event streams) and files are left alone.
+"""
+
+# app/compression.py
+import gzip
+
+from flask import request
+
+from app.cache import MemoryBackend
+
+try:
+    import brotli
+except ImportError: # Optional: gzip only
+    brotli = None
+
+
+def compress(data, encoding, gzip_level=6, brotli_quality=5):
+    if encoding == "br":
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0) # mtime=0: same input, same bytes
+
+
+def choose_encoding(available):
+    # The first of `available` (best first) the client accepts, or None
+    for encoding in available:
+        if request.accept_encodings[encoding]: # Quality > 0
+            return encoding
+    return None
+
+
+def init_compression(app):
+    if not app.config.get("COMPRESS_ENABLED", True):
+        return
+
+    min_size = app.config.get("COMPRESS_MIN_SIZE", 1024)
+    gzip_level = app.config.get("COMPRESS_GZIP_LEVEL", 6)
+    brotli_quality = app.config.get("COMPRESS_BROTLI_QUALITY", 5)
+    encodings = ("br", "gzip") if brotli is not None else ("gzip",)
+    compressed_bodies = MemoryBackend(app.config.get("COMPRESS_CACHE_MAX_ENTRIES", 512), default_ttl=3600)
+    app.extensions["compressed_bodies"] = compressed_bodies
+
+    @app.after_request
+    def compress_json(response):
+        if (response.status_code != 200 or response.mimetype != "application/json"
+                or response.direct_passthrough or response.is_streamed
+                or "Content-Encoding" in response.headers):
+            return response
+
+        body = response.get_data()
+        if len(body) < min_size:
+            return response
+        response.vary.add("Accept-Encoding") # Caches must keep one copy per encoding
+        encoding = choose_encoding(encodings)
+        if encoding is None:
+            return response
+
+        # 1. Already compressed this exact content?
+        etag, weak = response.get_etag()
+        key = f"{encoding}:{request.endpoint}:{etag}:{len(body)}" if etag and not weak else None
+        compressed = compressed_bodies.get(key) if key else None
+
+        # 2. No: compress it (and keep it, when it has an ETag)
+        if compressed is None:
+            compressed = compress(body, encoding, gzip_level, brotli_quality)
+            if key:
+                compressed_bodies.set(key, compressed)
+
+        response.set_data(compressed) # Also fixes Content-Length
+        response.headers["Content-Encoding"] = encoding
+        if etag:
+            response.set_etag(etag, weak=True)
+        return response
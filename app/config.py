@@ -30,8 +30,129 @@ class Config:
     # 3. PERFORMANCE: This disables a feature we don't need (tracking modifications consumes memory).
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Connection pool (turned into SQLALCHEMY_ENGINE_OPTIONS by app/database.py).
+    # Pool sizes are per gunicorn worker, so workers * (size + overflow) must fit under the MySQL max_connections.
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))     # Seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 280))    # Seconds; keep below the server/load balancer idle timeout
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    DB_CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', 10)) # Seconds
+
+    # SQLite only: applied to every new connection
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')   # Readers no longer block on place_order writes
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)) # Bytes
+
     # 4. JWT CONFIG: This is the secret key for signing JWT tokens.
     # JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-super-secret-key' # Your Code: Used a hardcoded JWT secret key for simplicity, but this is not secure for production.
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'default-jwt-secret')
 
-    JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=1) # Tokens will expire after 1 day
\ No newline at end of file
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=1) # Tokens will expire after 1 day
+    JWT_EMBED_USER_CLAIMS = os.getenv('JWT_EMBED_USER_CLAIMS', 'true').lower() == 'true' # Put the username inside the token
+
+    # Cache of user profiles used to resolve the JWT identity without a query. With CACHE_BACKEND=redis
+    # it is shared by all workers; otherwise each worker has its own copy (at most MAX_ENTRIES users)
+    USER_CACHE_MAX_ENTRIES = int(os.getenv('USER_CACHE_MAX_ENTRIES', 10000))
+    # Seconds. Without Redis, a change made on one worker reaches the others only when their copy expires
+    USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', 300))
+
+    # 5. SEARCH: 'auto' uses SQLite FTS5 when the database is SQLite and an in-process index otherwise.
+    # Set SEARCH_BACKEND=memory to force the in-process index.
+    SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'auto')
+    SEARCH_MAX_RESULTS = int(os.getenv('SEARCH_MAX_RESULTS', 500)) # A search never ranks more than this many restaurants
+    SEARCH_REFRESH_INTERVAL = int(os.getenv('SEARCH_REFRESH_INTERVAL', 5)) # In-process index: seconds between checks for other workers' writes
+
+    # 6. CACHE: 'memory' (per worker LRU), 'redis' (shared by all workers, needs CACHE_REDIS_URL) or 'none'
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_DEFAULT_TTL = int(os.getenv('CACHE_DEFAULT_TTL', 300)) # Seconds before a cached page is thrown away anyway
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 2048)) # Memory backend only: least recently used entries go first
+    # Memory backend only: a write invalidates only its own worker's copy, so entries live this long at most (seconds).
+    # Fine with one worker; with several, use CACHE_BACKEND=redis to get CACHE_DEFAULT_TTL and instant invalidation.
+    CACHE_MEMORY_TTL = int(os.getenv('CACHE_MEMORY_TTL', 5))
+
+    # 7. HTTP CACHING: how long browsers/CDNs may reuse a restaurant or menu response
+    # before they have to ask again (with If-None-Match, which is answered with a cheap 304).
+    CATALOG_CACHE_MAX_AGE = int(os.getenv('CATALOG_CACHE_MAX_AGE', 30))
+
+    # 8. PASSWORD HASHING: method + cost understood by werkzeug (e.g. 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000').
+    # Changing it is safe: old hashes keep working and are upgraded when the user next logs in.
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2)) # Hashing processes per web worker (0 = hash in the request thread)
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 8)) # More than this queued -> 429
+    PASSWORD_HASH_TIMEOUT = int(os.getenv('PASSWORD_HASH_TIMEOUT', 10)) # Seconds to wait for a result
+
+    # 9. INSTRUMENTATION: per-request SQL/serialization timing, Server-Timing header and /api/system/metrics
+    INSTRUMENTATION_ENABLED = os.getenv('INSTRUMENTATION_ENABLED', 'true').lower() == 'true'
+    SERVER_TIMING_HEADER = os.getenv('SERVER_TIMING_HEADER', 'true').lower() == 'true'
+    SLOW_QUERY_THRESHOLD_MS = int(os.getenv('SLOW_QUERY_THRESHOLD_MS', 200)) # Statements slower than this are logged
+
+    # 10. JSON: use the orjson encoder when it is installed (false = Flask's built-in encoder, same output)
+    JSON_USE_ORJSON = os.getenv('JSON_USE_ORJSON', 'true').lower() == 'true'
+
+    # 11. EXPORTS: GET /api/orders/export and `flask orders export`
+    # Comma separated user IDs allowed to export EVERY order (others only get their own)
+    REPORTING_USER_IDS = {uid.strip() for uid in os.getenv('REPORTING_USER_IDS', '').split(',') if uid.strip()}
+    # /api/system/* (cache, load, metrics) needs a reporting user too, unless this is true
+    SYSTEM_ENDPOINTS_PUBLIC = os.getenv('SYSTEM_ENDPOINTS_PUBLIC', 'false').lower() == 'true'
+    EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000)) # Rows fetched from the database per round trip
+
+    # 12. ORDER EVENTS: pushed order status changes (GET /api/orders/events and /events/stream)
+    # 'memory' only reaches clients connected to the same worker; use 'redis' with several workers
+    ORDER_EVENTS_BACKEND = os.getenv('ORDER_EVENTS_BACKEND', 'memory')
+    ORDER_EVENTS_REDIS_URL = os.getenv('ORDER_EVENTS_REDIS_URL', os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0'))
+    ORDER_EVENTS_BUFFER = int(os.getenv('ORDER_EVENTS_BUFFER', 100)) # Recent events kept per user for clients that reconnect
+    ORDER_EVENTS_POLL_TIMEOUT = int(os.getenv('ORDER_EVENTS_POLL_TIMEOUT', 25)) # Longest a long-poll request waits (seconds)
+    ORDER_EVENTS_HEARTBEAT = int(os.getenv('ORDER_EVENTS_HEARTBEAT', 15)) # SSE keep-alive comment every N seconds
+    ORDER_EVENTS_STREAM_MAX_AGE = int(os.getenv('ORDER_EVENTS_STREAM_MAX_AGE', 300)) # SSE streams end after this; EventSource reconnects
+    # May the two routes above keep a request open? 'auto' = only on gevent workers. A sync worker
+    # that waits serves nobody else and is killed after GUNICORN_TIMEOUT, so there they answer at
+    # once instead (the SSE stream sends what is new and ends) and clients come back after
+    # ORDER_EVENTS_POLL_INTERVAL seconds. 'true' for threaded servers (gthread, flask run), 'false' to never wait.
+    ORDER_EVENTS_HOLD_CONNECTIONS = os.getenv('ORDER_EVENTS_HOLD_CONNECTIONS', 'auto').lower()
+    ORDER_EVENTS_POLL_INTERVAL = int(os.getenv('ORDER_EVENTS_POLL_INTERVAL', 5))
+
+    # 13. IDEMPOTENCY: POST /api/orders/ with an Idempotency-Key header (see app/idempotency.py)
+    IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', 86400)) # Seconds a key (and its stored response) is kept
+    IDEMPOTENCY_WAIT = float(os.getenv('IDEMPOTENCY_WAIT', 5)) # How long a duplicate waits for the first request before a 409
+    IDEMPOTENCY_LOCK_TIMEOUT = int(os.getenv('IDEMPOTENCY_LOCK_TIMEOUT', 60)) # An unfinished claim older than this is taken over
+
+    # 14. GEO: GET /api/restaurants/nearby (see app/geo.py)
+    GEO_MAX_RADIUS_KM = float(os.getenv('GEO_MAX_RADIUS_KM', 50)) # Largest radius a client may ask for
+    GEO_DEFAULT_DELIVERY_RADIUS_KM = float(os.getenv('GEO_DEFAULT_DELIVERY_RADIUS_KM', 5)) # For restaurants without their own
+    GEO_MAX_DELIVERY_RADIUS_KM = float(os.getenv('GEO_MAX_DELIVERY_RADIUS_KM', 15)) # ?delivers=1 only looks this far
+
+    # 15. RATE LIMITING & LOAD SHEDDING (see app/ratelimit.py)
+    # Token buckets per client (JWT subject or IP): 'N/second|minute|hour|day', by endpoint or blueprint.
+    # The most specific rule wins; '' switches a rule off.
+    RATELIMIT_ENABLED = os.getenv('RATELIMIT_ENABLED', 'true').lower() == 'true'
+    RATELIMIT_RULES = {
+        'auth': os.getenv('RATELIMIT_AUTH', '60/minute'),
+        'auth.login': os.getenv('RATELIMIT_LOGIN', '10/minute'),
+        'auth.register': os.getenv('RATELIMIT_REGISTER', '5/minute'),
+        'orders.place_order': os.getenv('RATELIMIT_PLACE_ORDER', '30/minute'),
+    }
+    # 'memory' (per worker) or 'redis' (one set of buckets for every worker, needs RATELIMIT_REDIS_URL)
+    RATELIMIT_BACKEND = os.getenv('RATELIMIT_BACKEND', 'memory')
+    RATELIMIT_REDIS_URL = os.getenv('RATELIMIT_REDIS_URL', os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0'))
+    RATELIMIT_MAX_KEYS = int(os.getenv('RATELIMIT_MAX_KEYS', 50000)) # Memory backend only: clients tracked per worker
+    # More requests than this in progress in one worker -> 503 right away (0 = off)
+    LOAD_SHED_MAX_IN_FLIGHT = int(os.getenv('LOAD_SHED_MAX_IN_FLIGHT', 100))
+    LOAD_SHED_EXEMPT = {'system', 'orders.wait_for_order_events', 'orders.stream_order_events'} # Not counted, never shed (the event routes only stay open on gevent workers)
+
+    # 16. COMPRESSION & FRONTEND (see app/compression.py and app/frontend.py)
+    COMPRESS_ENABLED = os.getenv('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024)) # Smaller JSON bodies are sent as they are (bytes)
+    COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', 5)) # 0-11; only when `brotli` is installed
+    COMPRESS_CACHE_MAX_ENTRIES = int(os.getenv('COMPRESS_CACHE_MAX_ENTRIES', 512)) # Compressed catalog bodies kept per worker
+    FRONTEND_ENABLED = os.getenv('FRONTEND_ENABLED', 'true').lower() == 'true'
+    FRONTEND_SOURCE_DIR = os.path.join(basedir, '..', 'frontend')
+    FRONTEND_BUILD_DIR = os.getenv('FRONTEND_BUILD_DIR', os.path.join(basedir, '..', 'build', 'frontend'))
+
+    # 17. ORDER STATUS: PATCH /api/orders/<id>/status and POST /api/orders/status/bulk
+    # Comma separated user IDs (restaurant / courier staff) allowed to change ANY order's status;
+    # everyone else only their own orders, and never learns anything about other people's
+    ORDER_STAFF_USER_IDS = {uid.strip() for uid in os.getenv('ORDER_STAFF_USER_IDS', '').split(',') if uid.strip()}
@@ -0,0 +1,121 @@
+"""
+Database engine tuning.
+
+- configure_engine_options(app): builds SQLALCHEMY_ENGINE_OPTIONS from the DB_* settings
+  in Config (pool size, overflow, recycle, pre-ping, timeouts). Anything already set in
+  SQLALCHEMY_ENGINE_OPTIONS wins, so a config class can still override single options.
+- register_sqlite_pragmas(app): for SQLite, runs a few PRAGMAs on every new connection.
+  WAL mode lets readers keep reading while place_order is writing, which the default
+  rollback journal does not.
+- upsert(...): dialect-aware "insert or update" used by the bulk import tools.
+- advance_id_sequence(...): after inserting rows with explicit IDs, moves PostgreSQL's
+  id sequence past them (SQLite and MySQL do that on their own).
+"""
+
+# app/database.py
+import sqlite3
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+
+from app.extensions import db
+
+
+def _is_sqlite(uri):
+    return make_url(uri).get_backend_name() == "sqlite"
+
+
+def configure_engine_options(app):
+    # Call BEFORE db.init_app(app), the options are read when the engine is created
+    config = app.config
+    options = {
+        "pool_pre_ping": config["DB_POOL_PRE_PING"], # Test a connection before using it (dead ones get replaced)
+        "pool_recycle": config["DB_POOL_RECYCLE"],   # Reconnect before the server/load balancer drops idle connections
+    }
+
+    if not _is_sqlite(config["SQLALCHEMY_DATABASE_URI"]):
+        options.update({
+            "pool_size": config["DB_POOL_SIZE"],         # Connections kept open per worker
+            "max_overflow": config["DB_MAX_OVERFLOW"],   # Extra connections allowed during bursts
+            "pool_timeout": config["DB_POOL_TIMEOUT"],   # Seconds to wait for a free connection
+            "connect_args": {"connect_timeout": config["DB_CONNECT_TIMEOUT"]},
+        })
+
+    options.update(config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+
+
+def sqlite_pragma_listener(journal_mode="WAL", synchronous="NORMAL", busy_timeout_ms=5000, mmap_size=0):
+    # Returns a "connect" event listener that applies the PRAGMAs to each new SQLite connection
+    def set_pragmas(dbapi_connection, _connection_record):
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={journal_mode}")     # WAL: readers don't wait for writers
+        cursor.execute(f"PRAGMA synchronous={synchronous}")       # NORMAL is safe with WAL and much faster than FULL
+        cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}") # Wait for a lock instead of failing at once
+        cursor.execute(f"PRAGMA mmap_size={int(mmap_size)}")      # Read the file through memory mapping
+        cursor.close()
+    return set_pragmas
+
+
+def register_sqlite_pragmas(app):
+    # Call AFTER db.init_app(app)
+    if not _is_sqlite(app.config["SQLALCHEMY_DATABASE_URI"]):
+        return
+    listener = sqlite_pragma_listener(
+        journal_mode=app.config["SQLITE_JOURNAL_MODE"],
+        synchronous=app.config["SQLITE_SYNCHRONOUS"],
+        busy_timeout_ms=app.config["SQLITE_BUSY_TIMEOUT_MS"],
+        mmap_size=app.config["SQLITE_MMAP_SIZE"],
+    )
+    with app.app_context():
+        event.listen(db.engine, "connect", listener)
+
+
+def upsert(connection, table, rows, key_columns=("id",), update_columns=(), increment_columns=()):
+    """
+    INSERT rows, or UPDATE the existing row when the key already exists, as ONE executemany.
+    - update_columns are overwritten with the new value,
+    - increment_columns are added to (e.g. counters, versions).
+    Supports SQLite, PostgreSQL and MySQL/MariaDB.
+    """
+    if not rows:
+        return
+    dialect = connection.dialect.name
+
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table)
+        new = stmt.excluded
+        values = {name: new[name] for name in update_columns}
+        values.update({name: table.c[name] + new[name] for name in increment_columns})
+        stmt = stmt.on_conflict_do_update(index_elements=list(key_columns), set_=values)
+    elif dialect in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table)
+        new = stmt.inserted
+        values = {name: new[name] for name in update_columns}
+        values.update({name: table.c[name] + new[name] for name in increment_columns})
+        stmt = stmt.on_duplicate_key_update(values)
+    else:
+        raise NotImplementedError(f"upsert is not supported on {dialect}")
+
+    connection.execute(stmt, rows)
+
+
+def advance_id_sequence(connection, table, column="id"):
+    """
+    Rows inserted WITH their id don't move PostgreSQL's sequence, so the next normal INSERT
+    would get an id that is already taken. Sets the sequence to continue after MAX(id).
+    """
+    if connection.dialect.name != "postgresql":
+        return
+    connection.execute(
+        text(f"SELECT setval(pg_get_serial_sequence(:table, :column), "
+             f"COALESCE((SELECT MAX({column}) FROM {table.name}), 0) + 1, false)"),
+        {"table": table.name, "column": column},
+    )
@@ -1,5 +1,5 @@
 # app/errors.py
-from flask import jsonify
+from flask import jsonify, current_app
 from werkzeug.http import HTTP_STATUS_CODES
 
 def error_response(status_code, message=None):
@@ -25,8 +25,29 @@ def register_error_handlers(app):
     def method_not_allowed(error):
         return error_response(405, message="Method not allowed for this endpoint")
 
+    # 429: Too Many Requests (e.g. the password hashing queue is full)
+    @app.errorhandler(429)
+    def too_many_requests(error):
+        response, status = error_response(429, message=error.description or "Too many requests, slow down")
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after:
+            response.headers['Retry-After'] = str(retry_after)
+        return response, status
+
+    # 503: Service Unavailable (e.g. this worker is already handling too many requests)
+    @app.errorhandler(503)
+    def service_unavailable(error):
+        response, status = error_response(503, message=error.description or "Service unavailable, try again shortly")
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after:
+            response.headers['Retry-After'] = str(retry_after)
+        return response, status
+
     # 500: Internal Server Error (e.g. Your code crashed)
     @app.errorhandler(500)
     def internal_error(error):
-        # In a real app, we would log the specific error to a file here
+        # A crash was already logged by Flask (with its traceback) before this handler runs;
+        # only an explicit abort(500) still needs a log line
+        if getattr(error, 'original_exception', None) is None:
+            current_app.logger.error("Internal error: %s", error.description)
         return error_response(500, message="An internal error occurred")
\ No newline at end of file
@@ -0,0 +1,172 @@
+"""
+Order events: "order 42 is now preparing", pushed to the customer instead of polled.
+
+place_order and update_order_status publish an event after they commit. Clients wait for
+the events of THEIR orders on GET /api/orders/events (long-poll) or
+GET /api/orders/events/stream (Server-Sent Events), see app/api/orders.py.
+
+Every event has an id. A client sends back the last id it saw (?after= or the
+Last-Event-ID header EventSource sends when it reconnects) and gets everything newer,
+so nothing is lost between two requests, as long as it is still in the buffer.
+
+Two brokers share the same interface:
+- MemoryBroker: in-process, keeps the last ORDER_EVENTS_BUFFER events per user.
+  Only sees events published by the SAME worker, so use it with one worker (or in development).
+- RedisBroker: one Redis stream per user, shared by every worker (needs the optional `redis` package).
+
+Waiting is only cheap on gevent workers, where a waiting request is a parked greenlet. A sync
+worker that waits serves nobody else meanwhile, and gunicorn kills it (with its MemoryBroker)
+once a request outlives GUNICORN_TIMEOUT. So unless ORDER_EVENTS_HOLD_CONNECTIONS says otherwise,
+the routes only wait when gevent has patched the process; elsewhere they answer at once
+and the client comes back after ORDER_EVENTS_POLL_INTERVAL seconds (see app/api/orders.py).
+"""
+
+# app/events.py
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+
+from flask import current_app
+
+
+def order_event(order):
+    # The payload sent to clients: small, just what changed
+    return {
+        "order_id": order.id,
+        "restaurant_id": order.restaurant_id,
+        "status": order.status,
+        "version": order.version,
+        "at": time.time(),
+    }
+
+
+class MemoryBroker:
+    def __init__(self, buffer_size=100, max_users=10000):
+        self.buffer_size = buffer_size
+        self.max_users = max_users
+        self._condition = threading.Condition()
+        self._events = OrderedDict()   # user_id -> deque of (event_id, event), least recently used first
+        self._last_id = 0
+
+    def publish(self, user_id, event):
+        user_id = str(user_id)
+        with self._condition:
+            self._last_id += 1
+            events = self._events.get(user_id)
+            if events is None:
+                events = self._events[user_id] = deque(maxlen=self.buffer_size)
+                if len(self._events) > self.max_users:
+                    self._events.popitem(last=False) # Forget the user we haven't heard about longest
+            else:
+                self._events.move_to_end(user_id)
+            events.append((str(self._last_id), event))
+            self._condition.notify_all()
+
+    def latest_id(self, user_id):
+        # Subscribing "from now on" starts after this id
+        with self._condition:
+            return str(self._last_id)
+
+    def _newer(self, user_id, after):
+        events = self._events.get(str(user_id), ())
+        return [(event_id, event) for event_id, event in events if int(event_id) > after]
+
+    def wait(self, user_id, after_id, timeout):
+        # Events newer than after_id; blocks up to `timeout` seconds until there is at least one
+        try:
+            after = int(after_id)
+        except (TypeError, ValueError):
+            after = 0
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            found = self._newer(user_id, after)
+            while not found:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+                found = self._newer(user_id, after)
+            return found
+
+
+class RedisBroker:
+    def __init__(self, url, buffer_size=100, retention=86400, prefix="zomighty:order-events:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("ORDER_EVENTS_BACKEND=redis needs the 'redis' package (pip install redis)")
+
+        self.buffer_size = buffer_size
+        self.retention = retention
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def _key(self, user_id):
+        return f"{self.prefix}{user_id}"
+
+    def publish(self, user_id, event):
+        key = self._key(user_id)
+        pipe = self._client.pipeline()
+        pipe.xadd(key, {"data": json.dumps(event)}, maxlen=self.buffer_size, approximate=True)
+        pipe.expire(key, self.retention) # Users who stop ordering don't keep a stream forever
+        pipe.execute()
+
+    def latest_id(self, user_id):
+        last = self._client.xrevrange(self._key(user_id), count=1)
+        return last[0][0].decode() if last else "0"
+
+    def wait(self, user_id, after_id, timeout):
+        # XREAD BLOCK: Redis itself holds the request until something arrives
+        key = self._key(user_id)
+        block_ms = max(int(timeout * 1000), 1)
+        response = self._client.xread({key: after_id or "0"}, count=self.buffer_size, block=block_ms)
+        if not response:
+            return []
+        _key, entries = response[0]
+        return [(event_id.decode(), json.loads(fields[b"data"])) for event_id, fields in entries]
+
+
+class OrderEvents:
+    """The object the rest of the app talks to; the broker is chosen from the config."""
+
+    def init_app(self, app):
+        backend = app.config.get("ORDER_EVENTS_BACKEND", "memory")
+        buffer_size = app.config.get("ORDER_EVENTS_BUFFER", 100)
+
+        if backend == "memory":
+            app.extensions["order_events"] = MemoryBroker(buffer_size)
+        elif backend == "redis":
+            app.extensions["order_events"] = RedisBroker(app.config["ORDER_EVENTS_REDIS_URL"], buffer_size)
+        else:
+            raise RuntimeError(f"Unknown ORDER_EVENTS_BACKEND: {backend}")
+
+    @property
+    def broker(self):
+        return current_app.extensions["order_events"]
+
+    def publish(self, user_id, event):
+        # Called after the order was committed: a broken broker must not turn that into an error
+        try:
+            self.broker.publish(user_id, event)
+        except Exception:
+            current_app.logger.exception("Could not publish order event %s", event)
+
+    def latest_id(self, user_id):
+        return self.broker.latest_id(user_id)
+
+    def wait(self, user_id, after_id, timeout):
+        return self.broker.wait(user_id, after_id, timeout)
+
+    def can_hold_connections(self):
+        """True when a request may wait for events without blocking its whole worker."""
+        setting = current_app.config.get("ORDER_EVENTS_HOLD_CONNECTIONS", "auto")
+        if setting != "auto":
+            return setting == "true"
+        monkey = sys.modules.get("gevent.monkey") # Imported by the gevent worker (or gunicorn.conf.py)
+        return monkey is not None and monkey.is_module_patched("socket")
+
+
+# One shared instance, like `cache` in app/cache.py
+order_events = OrderEvents()
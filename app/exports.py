@@ -0,0 +1,135 @@
+"""
+Streaming order exports for reporting jobs.
+
+Used by GET /api/orders/export and `flask orders export`. Both output either
+- NDJSON: one JSON object per order (its line items nested), one per line, or
+- CSV: one row per line item, with the order columns repeated on every row.
+
+The rows come from ONE query (orders LEFT JOIN order_items) executed with
+yield_per: the driver hands them over in small batches and we turn each batch
+into text right away, so memory use is the same for 10 orders or 10 million.
+"""
+
+# app/exports.py
+import csv
+import io
+from datetime import datetime
+
+from app.extensions import db
+from app.models import Order, OrderItem
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+CSV_HEADER = ("order_id", "user_id", "restaurant_id", "status", "total_price", "created_at",
+              "menu_item_id", "item_name", "quantity", "price")
+
+
+def parse_datetime(value):
+    # "2024-05-01" or "2024-05-01T12:30:00"; raises ValueError for anything else
+    if value is None or value == "":
+        return None
+    return datetime.fromisoformat(value)
+
+
+def order_export_query(start=None, end=None, restaurant_id=None, user_id=None):
+    # start is inclusive, end is exclusive: [start, end)
+    query = (
+        db.select(Order.id, Order.user_id, Order.restaurant_id, Order.status, Order.total_price,
+                  Order.created_at, OrderItem.menu_item_id, OrderItem.item_name,
+                  OrderItem.quantity, OrderItem.price_at_order)
+        .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+        .order_by(Order.created_at, Order.id, OrderItem.id)
+    )
+    if start is not None:
+        query = query.where(Order.created_at >= start)
+    if end is not None:
+        query = query.where(Order.created_at < end)
+    if restaurant_id is not None:
+        query = query.where(Order.restaurant_id == restaurant_id)
+    if user_id is not None:
+        query = query.where(Order.user_id == user_id)
+    return query
+
+
+def stream_rows(query, batch_size=1000):
+    # yield_per = server-side cursor: only `batch_size` rows are held in memory at a time
+    result = db.session.execute(query.execution_options(yield_per=batch_size))
+    try:
+        for partition in result.partitions():
+            yield from partition
+    finally:
+        result.close()
+
+
+def iter_orders(rows):
+    # The rows are sorted by order, so an order's lines are next to each other:
+    # collect them and emit the order as soon as the next one starts.
+    current = None
+    for row in rows:
+        if current is None or current["id"] != row.id:
+            if current is not None:
+                yield current
+            current = {
+                "id": row.id,
+                "user_id": row.user_id,
+                "restaurant_id": row.restaurant_id,
+                "status": row.status,
+                "total_price": row.total_price,
+                "date": row.created_at,
+                "items": [],
+            }
+        if row.item_name is not None: # LEFT JOIN: an order without lines still shows up
+            current["items"].append({
+                "menu_item_id": row.menu_item_id,
+                "name": row.item_name,
+                "quantity": row.quantity,
+                "price": row.price_at_order,
+            })
+    if current is not None:
+        yield current
+
+
+def ndjson_lines(rows, dumps):
+    # dumps is the app's JSON encoder (current_app.json.dumps), so prices/dates match the API
+    for order in iter_orders(rows):
+        yield dumps(order) + "\n"
+
+
+def csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    for row in rows:
+        writer.writerow((row.id, row.user_id, row.restaurant_id, row.status, row.total_price,
+                         row.created_at.isoformat() if row.created_at else "",
+                         row.menu_item_id, row.item_name, row.quantity, row.price_at_order))
+        # Hand over what was written so far and reuse the buffer
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    yield buffer.getvalue() # The header, when there were no rows at all
+
+
+def chunked(pieces, size=64 * 1024):
+    # Glue the small lines into ~64 KB chunks: far fewer writes to the socket / file
+    parts = []
+    length = 0
+    for piece in pieces:
+        parts.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield "".join(parts)
+            parts = []
+            length = 0
+    if parts:
+        yield "".join(parts)
+
+
+def export_orders(fmt, dumps, batch_size=1000, **filters):
+    # The whole export as a stream of text chunks, in the format asked for
+    rows = stream_rows(order_export_query(**filters), batch_size)
+    lines = ndjson_lines(rows, dumps) if fmt == "ndjson" else csv_lines(rows)
+    return chunked(lines)
@@ -0,0 +1,167 @@
+"""
+Serves the bundled frontend (frontend/*.html) from the app itself.
+
+`flask --app run frontend build` (run at deploy time, see bin/post_compile) copies
+the files of frontend/ (a flat folder) into FRONTEND_BUILD_DIR and, for every file:
+1. content hashing: assets (anything but .html) are written as name.<hash>.ext and the
+   HTML is rewritten to point at the new names. A changed file gets a new URL, so assets
+   can be cached "forever" (Cache-Control: immutable). HTML pages keep their names (they
+   are what users open and bookmark); they are revalidated every time instead, which costs
+   a 304 when nothing changed,
+2. precompression: a .gz (gzip -9) and a .br (brotli quality 11, needs the optional
+   `brotli` package) next to each file, kept only when they are actually smaller,
+3. manifest.json: URL -> file, hash, mimetype and the encodings that exist.
+
+At request time nothing is compressed: the best variant the client accepts is sent
+as it is, with Content-Encoding and an ETag per variant.
+Without a build (development) the files are served from frontend/ uncompressed and uncached.
+"""
+
+# app/frontend.py
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+
+from flask import Blueprint, abort, current_app, send_file, send_from_directory
+
+from app.compression import brotli, choose_encoding
+
+frontend_bp = Blueprint('frontend', __name__)
+
+MANIFEST = "manifest.json"
+SUFFIXES = {"gzip": ".gz", "br": ".br"}
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# href="style.css" / src='app.js' in the HTML pages
+_REFERENCE_RE = re.compile(r"""(\b(?:href|src)=["'])([^"'#?:]+)(["'#?])""")
+
+
+# --- BUILD ---
+
+def _content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def _write_variants(path, data):
+    # The precompressed copies, only where they save something (images are compressed already)
+    encodings = []
+    variants = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(data, quality=11)
+    for encoding, compressed in variants.items():
+        if len(compressed) < len(data) * 0.9:
+            with open(path + SUFFIXES[encoding], "wb") as f:
+                f.write(compressed)
+            encodings.append(encoding)
+    return encodings
+
+
+def build_frontend(source, target):
+    """Build `source` into `target` (replaced completely). Returns the manifest."""
+    if os.path.isdir(target):
+        shutil.rmtree(target)
+    os.makedirs(target)
+
+    files = sorted(name for name in os.listdir(source) if os.path.isfile(os.path.join(source, name)))
+
+    # 1. Assets first: their hashed names are needed to rewrite the pages
+    manifest = {}
+    for name in files:
+        if name.endswith(".html"):
+            continue
+        with open(os.path.join(source, name), "rb") as f:
+            data = f.read()
+        digest = _content_hash(data)
+        stem, extension = os.path.splitext(name)
+        manifest[name] = {"file": f"{stem}.{digest}{extension}", "hash": digest, "immutable": True}
+
+    # 2. Pages: point their references at the hashed assets
+    def replace(match):
+        asset = manifest.get(match.group(2))
+        if asset is None:
+            return match.group(0) # Another page, an absolute URL, ...
+        return match.group(1) + asset["file"] + match.group(3)
+
+    pages = {}
+    for name in files:
+        if name.endswith(".html"):
+            with open(os.path.join(source, name), encoding="utf-8") as f:
+                data = _REFERENCE_RE.sub(replace, f.read()).encode("utf-8")
+            pages[name] = data
+            manifest[name] = {"file": name, "hash": _content_hash(data), "immutable": False}
+
+    # 3. Write everything with its compressed variants
+    for name, entry in manifest.items():
+        if name in pages:
+            data = pages[name]
+        else:
+            with open(os.path.join(source, name), "rb") as f:
+                data = f.read()
+        path = os.path.join(target, entry["file"])
+        with open(path, "wb") as f:
+            f.write(data)
+        entry["size"] = len(data)
+        entry["encodings"] = _write_variants(path, data)
+        entry["mimetype"] = mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+    # Served by their hashed name as well as their original one
+    by_url = dict(manifest)
+    for name, entry in manifest.items():
+        by_url[entry["file"]] = entry
+    with open(os.path.join(target, MANIFEST), "w") as f:
+        json.dump(by_url, f, indent=2, sort_keys=True)
+    return manifest
+
+
+# --- SERVING ---
+
+def _manifest():
+    # Read once per worker; a new build comes with a new deploy (= new workers)
+    if "frontend_manifest" not in current_app.extensions:
+        path = os.path.join(current_app.config["FRONTEND_BUILD_DIR"], MANIFEST)
+        manifest = None
+        if os.path.exists(path):
+            with open(path) as f:
+                manifest = json.load(f)
+        current_app.extensions["frontend_manifest"] = manifest
+    return current_app.extensions["frontend_manifest"]
+
+
+@frontend_bp.route('/', defaults={'filename': 'index.html'})
+@frontend_bp.route('/<filename>') # No slashes: /api/... never ends up here
+def serve(filename):
+    manifest = _manifest()
+    if manifest is None:
+        # No build (development): the raw files, always fetched again
+        response = send_from_directory(current_app.config["FRONTEND_SOURCE_DIR"], filename, max_age=0)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    entry = manifest.get(filename)
+    if entry is None:
+        abort(404)
+
+    # 1. The best variant the client accepts (precompressed at build time)
+    encoding = choose_encoding([name for name in ("br", "gzip") if name in entry["encodings"]])
+    path = os.path.join(current_app.config["FRONTEND_BUILD_DIR"], entry["file"])
+    if encoding:
+        path += SUFFIXES[encoding]
+
+    # 2. Send it; conditional=True answers If-None-Match with a 304
+    response = send_file(path, mimetype=entry["mimetype"], conditional=True,
+                         etag=entry["hash"] + (f"-{encoding}" if encoding else ""))
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+
+    # 3. Hashed assets never change; pages are revalidated on every visit
+    requested_hashed = entry["immutable"] and filename == entry["file"]
+    if requested_hashed:
+        response.headers["Cache-Control"] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        response.headers["Cache-Control"] = "no-cache"
+    return response
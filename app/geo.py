@@ -0,0 +1,185 @@
+"""
+"Restaurants near me" without scanning every restaurant.
+
+Each restaurant stores its latitude / longitude AND a geohash of them: a short string
+where nearby points share a prefix ("dr5ru7..." is in Manhattan, every point starting
+with "dr5r" is within a ~20 x 40 km cell). An ordinary B-tree index on that column then
+answers "everything in this cell" as a range scan:
+
+    WHERE geohash >= 'dr5r' AND geohash < 'dr5s'
+
+For a radius search we:
+1. pick the longest geohash (smallest cells) that covers the circle's bounding box with
+   at most MAX_CELLS cells, and list those cells,
+2. read only the restaurants in those cells: one index range scan per cell, and the
+   bounding box check happens inside the index (geohash, latitude, longitude),
+3. compute the exact distance in Python and drop what is outside the circle.
+
+This is plain SQL, so it works the same on SQLite, PostgreSQL and MySQL.
+(Circles crossing the 180th meridian are cut off at it, fine for a delivery app.)
+"""
+
+# app/geo.py
+import math
+
+from app.extensions import db
+from app.models import Restaurant
+
+EARTH_RADIUS_KM = 6371.0088
+GEOHASH_PRECISION = 9 # Stored length: cells of ~5 x 5 m, far more precise than we need
+MAX_CELLS = 16        # Cells (= index range scans) per radius query
+NEAREST_START_KM = 1.0 # find_nearest() starts with this radius and doubles it
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def valid_coordinates(latitude, longitude):
+    return (isinstance(latitude, (int, float)) and isinstance(longitude, (int, float))
+            and not isinstance(latitude, bool) and not isinstance(longitude, bool)
+            and -90 <= latitude <= 90 and -180 <= longitude <= 180)
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    # Standard geohash: alternately halve the longitude and latitude ranges, 5 bits per character
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True # Even bits are longitude
+    while len(chars) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if longitude >= mid:
+                value = (value << 1) | 1
+                lng_range[0] = mid
+            else:
+                value <<= 1
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                value = (value << 1) | 1
+                lat_range[0] = mid
+            else:
+                value <<= 1
+                lat_range[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def cell_size(precision):
+    # (height, width) of a geohash cell in degrees
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    # (min_lat, min_lng, max_lat, max_lng) around the circle (longitudes get narrower towards the poles)
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(latitude))
+    lng_delta = 180.0 if cos_lat < 1e-6 else min(180.0, lat_delta / cos_lat)
+    return (max(-90.0, latitude - lat_delta), max(-180.0, longitude - lng_delta),
+            min(90.0, latitude + lat_delta), min(180.0, longitude + lng_delta))
+
+
+def covering_prefixes(min_lat, min_lng, max_lat, max_lng):
+    """The geohash prefixes of the cells covering the box: the smallest cells (= fewest
+    restaurants to read) that still cover it with at most MAX_CELLS cells."""
+    height, width = max_lat - min_lat, max_lng - min_lng
+    precision = GEOHASH_PRECISION
+    while precision > 1:
+        cell_height, cell_width = cell_size(precision)
+        # A box spans at most (size // cell + 2) cells on each axis
+        if (int(height / cell_height) + 2) * (int(width / cell_width) + 2) <= MAX_CELLS:
+            break
+        precision -= 1
+    cell_height, cell_width = cell_size(precision)
+
+    prefixes = set()
+    lat = min_lat
+    while True:
+        lng = min_lng
+        while True:
+            prefixes.add(encode(min(lat, max_lat), min(lng, max_lng), precision))
+            if lng >= max_lng:
+                break
+            lng = min(lng + cell_width, max_lng)
+        if lat >= max_lat:
+            break
+        lat = min(lat + cell_height, max_lat)
+    return sorted(prefixes)
+
+
+def prefix_range(prefix):
+    """
+    (low, high): every geohash starting with `prefix` is >= low and < high ("dr5r" -> "dr5r", "dr5s").
+    high is None when there is no upper bound ("zz"). Only geohash characters are used, so this
+    sorts the same under any database collation.
+    """
+    head = prefix
+    while head:
+        position = _BASE32.index(head[-1])
+        if position + 1 < len(_BASE32):
+            return prefix, head[:-1] + _BASE32[position + 1]
+        head = head[:-1]
+    return prefix, None
+
+
+# --- QUERIES ---
+
+def find_within(latitude, longitude, radius_km, columns=()):
+    """[(distance_km, row)] of the restaurants within radius_km, nearest first. Rows only have
+    id, lat and lng plus any extra Restaurant `columns`: load the full rows of the page you
+    actually return afterwards, there can be thousands of matches."""
+    min_lat, min_lng, max_lat, max_lng = bounding_box(latitude, longitude, radius_km)
+
+    cells = []
+    for prefix in covering_prefixes(min_lat, min_lng, max_lat, max_lng):
+        low, high = prefix_range(prefix)
+        cells.append(db.and_(Restaurant.geohash >= low, Restaurant.geohash < high)
+                     if high is not None else Restaurant.geohash >= low)
+
+    rows = db.session.execute(
+        db.select(Restaurant.id, Restaurant.latitude.label("lat"), Restaurant.longitude.label("lng"), *columns)
+        .where(db.or_(*cells))
+        .where(Restaurant.latitude.between(min_lat, max_lat), Restaurant.longitude.between(min_lng, max_lng))
+    )
+
+    # Exact distances (the box's corners are outside the circle). This loop runs for every
+    # candidate, so it is haversine_km() with everything about the centre computed once.
+    lat1, lng1 = math.radians(latitude), math.radians(longitude)
+    cos_lat1 = math.cos(lat1)
+    radians, sin, cos = math.radians, math.sin, math.cos
+    found = []
+    for row in rows:
+        lat2 = radians(row[1])
+        a = sin((lat2 - lat1) / 2) ** 2 + cos_lat1 * cos(lat2) * sin((radians(row[2]) - lng1) / 2) ** 2
+        distance = 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+        if distance <= radius_km:
+            found.append((distance, row))
+    found.sort(key=lambda pair: pair[0])
+    return found
+
+
+def find_nearest(latitude, longitude, limit, max_radius_km, columns=()):
+    # Grow the circle until it holds `limit` restaurants: everything inside a circle is found,
+    # so its nearest `limit` are also the nearest overall
+    radius = min(NEAREST_START_KM, max_radius_km)
+    while True:
+        found = find_within(latitude, longitude, radius, columns)
+        if len(found) >= limit or radius >= max_radius_km:
+            return found[:limit], radius
+        radius = min(radius * 2, max_radius_km)
@@ -0,0 +1,102 @@
+"""
+Password hashing that can't take the whole API down.
+
+scrypt/pbkdf2 are slow ON PURPOSE (that's what makes stolen hashes hard to crack),
+but running them inside the request thread means a burst of logins pins every
+gunicorn worker and catalog reads starve. So:
+- the hashing runs in a small pool of separate processes,
+- only PASSWORD_HASH_MAX_PENDING hashes may be queued or running at once;
+  anything beyond that is rejected right away with 429 Too Many Requests,
+- the cost (method + parameters) comes from Config, and hashes made with an
+  older cost are upgraded the next time that user logs in.
+"""
+
+# app/hashing.py
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+from flask import current_app
+from werkzeug.exceptions import TooManyRequests
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HashingBusy(TooManyRequests):
+    description = "Too many logins in progress, please try again shortly"
+
+    def __init__(self):
+        super().__init__(retry_after=1)
+
+
+class PasswordHasher:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+        self._slots = None
+        self._method_prefix = None
+
+    def init_app(self, app):
+        # The defaults live in Config only (create_app always starts from it)
+        self._slots = threading.BoundedSemaphore(app.config["PASSWORD_HASH_MAX_PENDING"])
+        app.extensions["password_hasher"] = self
+
+    @property
+    def method(self):
+        return current_app.config["PASSWORD_HASH_METHOD"]
+
+    def _get_executor(self, workers):
+        # One pool per process. After a fork (gunicorn preload) the child builds its own,
+        # because a pool inherited from the parent doesn't work.
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _run(self, func, *args):
+        # Backpressure: grab a slot WITHOUT waiting. No free slot -> 429 immediately.
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+
+        workers = current_app.config["PASSWORD_HASH_WORKERS"]
+        if workers <= 0:
+            try:
+                return func(*args) # No pool configured (e.g. tests): hash in this thread
+            finally:
+                self._slots.release()
+
+        try:
+            future = self._get_executor(workers).submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        # The slot is given back when the hash is really finished (or cancelled before it
+        # started), not when we stop waiting: a timed-out hash still keeps a pool process busy.
+        future.add_done_callback(lambda _future: self._slots.release())
+        try:
+            return future.result(timeout=current_app.config["PASSWORD_HASH_TIMEOUT"])
+        except FutureTimeoutError:
+            future.cancel() # Only works if it is still queued
+            raise HashingBusy()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        # A hash starts with its method and cost, e.g. "scrypt:32768:8:1$salt$hash".
+        # werkzeug fills in default parameters, so learn the full prefix from one real hash.
+        if self._method_prefix is None or self._method_prefix[0] != self.method:
+            sample = generate_password_hash("", self.method)
+            self._method_prefix = (self.method, sample.split("$", 1)[0])
+        return pwhash.split("$", 1)[0] != self._method_prefix[1]
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,174 @@
+"""
+Idempotency keys: a retried request gets the FIRST response again instead of running twice.
+
+A client that may retry (a phone on a bad connection) sends a unique key with the request:
+
+    POST /api/orders/
+    Idempotency-Key: 6f1c2e0a-...
+
+1. The first request with that key "claims" it: a row in idempotency_keys with no result yet,
+   committed right away so every worker can see it.
+2. When it finishes, its status code and body are stored in that row.
+3. A retry with the same key gets the stored response back (with `Idempotent-Replayed: true`)
+   without touching the menu or order tables. A duplicate that arrives while the first request
+   is still running waits a moment for it to finish, then gets its response (or a 409).
+
+Keys are per user and expire after IDEMPOTENCY_TTL; expired rows are deleted in bulk now and then.
+Server errors (5xx) are not stored, so those can be retried for real.
+Note: if a worker dies between committing the order and storing the response, the claim is
+given up after IDEMPOTENCY_LOCK_TIMEOUT and a retry runs again.
+"""
+
+# app/idempotency.py
+import hashlib
+import itertools
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, jsonify, make_response, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+PURGE_EVERY = 100 # Delete expired keys once every N claims (per worker)
+
+_claims = itertools.count(1)
+
+
+def _request_hash():
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.path}\n".encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _claim(user_id, key, request_hash, now):
+    # True if this request got the key, False if another request already has it
+    config = current_app.config
+    try:
+        db.session.execute(db.insert(IdempotencyKey).values(
+            user_id=user_id, key=key, request_hash=request_hash,
+            created_at=now, expires_at=now + timedelta(seconds=config["IDEMPOTENCY_TTL"]),
+        ))
+        db.session.commit()
+        return True
+    except IntegrityError:
+        db.session.rollback()
+        return False
+
+
+def _load(user_id, key):
+    return db.session.execute(
+        db.select(IdempotencyKey).where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        .execution_options(populate_existing=True) # Always read what is in the database now
+    ).scalar_one_or_none()
+
+
+def _release(user_id, key):
+    # Give the key up (the request failed), so a retry can run
+    db.session.rollback()
+    db.session.execute(db.delete(IdempotencyKey).where(
+        IdempotencyKey.user_id == user_id, IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None)
+    ))
+    db.session.commit()
+
+
+def _take_over(record):
+    # Delete a claim that expired or was abandoned, but only if it is still the one we read:
+    # of two retries taking it over at once, exactly one deletes it. True if that was us.
+    result = db.session.execute(
+        db.delete(IdempotencyKey).where(
+            IdempotencyKey.user_id == record.user_id, IdempotencyKey.key == record.key,
+            IdempotencyKey.created_at == record.created_at,
+        ).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def _in_progress():
+    response = jsonify({"error": f"A request with this {HEADER} is still in progress"})
+    response.headers["Retry-After"] = "1"
+    return response, 409
+
+
+def _replay(record):
+    response = current_app.response_class(record.body, status=record.status_code, mimetype=record.mimetype)
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _purge_expired(now):
+    db.session.execute(db.delete(IdempotencyKey).where(IdempotencyKey.expires_at < now))
+    db.session.commit()
+
+
+def idempotent(view):
+    """Put this UNDER @jwt_required(): requests without the header run as usual."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view(*args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return jsonify({"error": f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters"}), 400
+
+        config = current_app.config
+        user_id = int(get_jwt_identity())
+        request_hash = _request_hash()
+        now = datetime.utcnow()
+
+        if next(_claims) % PURGE_EVERY == 0:
+            _purge_expired(now)
+
+        # 1. Claim the key, or find out what the request that has it did
+        deadline = time.monotonic() + config["IDEMPOTENCY_WAIT"]
+        delay = 0.02
+        while not _claim(user_id, key, request_hash, now):
+            record = _load(user_id, key)
+            if record is not None and (record.expires_at < now or (
+                    record.status_code is None
+                    and record.created_at < now - timedelta(seconds=config["IDEMPOTENCY_LOCK_TIMEOUT"]))):
+                # Expired, or claimed by a request that never finished: take it over
+                if _take_over(record):
+                    continue # Free now: claim it
+                record = None # Another retry took it over first
+            if record is not None:
+                if record.request_hash != request_hash:
+                    return jsonify({"error": f"This {HEADER} was already used for a different request"}), 422
+                if record.status_code is not None:
+                    return _replay(record)
+            # 2. The first request is still running (or the key was just released, expired or
+            # taken over by another retry): wait a little and try again, until the deadline
+            if time.monotonic() >= deadline:
+                return _in_progress()
+            db.session.rollback() # Don't keep a read transaction open while sleeping
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
+            now = datetime.utcnow()
+
+        # 3. We own the key: run the real view and keep its response
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            _release(user_id, key)
+            raise
+
+        if response.status_code >= 500:
+            _release(user_id, key)
+            return response
+
+        db.session.rollback() # Anything the view left uncommitted is not ours to save
+        db.session.execute(
+            db.update(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+            .values(status_code=response.status_code, mimetype=response.mimetype, body=response.get_data())
+        )
+        db.session.commit()
+        return response
+    return wrapper
@@ -0,0 +1,116 @@
+"""
+Turns the JWT on a request into "who is this?" without hitting the database every time.
+
+Flask-JWT-Extended calls our user_lookup_loader on every @jwt_required() route.
+Instead of User.query.get() each time, we cache user profiles (only
+non-sensitive fields, never the password hash) and drop the entry when that
+user row is updated or deleted (once at flush and again after the commit, so a
+read in between cannot put the old row back).
+
+Where the profiles live decides how far that invalidation reaches:
+- CACHE_BACKEND=redis: in the shared cache, so an update made by one worker
+  is seen by all of them on their next request.
+- otherwise: in a small per-worker LRU. Only the worker that made the change
+  drops its copy; the others keep serving the old profile for at most
+  USER_CACHE_TTL seconds. That TTL IS the staleness window, keep it short.
+Routes read the profile through flask_jwt_extended.current_user.
+"""
+
+# app/identity.py
+from datetime import datetime
+
+from flask import current_app, has_app_context, jsonify
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.cache import MemoryBackend
+from app.extensions import db, jwt
+from app.models import User
+
+
+def _profile_key(user_id):
+    return f"user:{user_id}"
+
+
+def user_claims(user):
+    # Extra (non-sensitive!) claims stored inside the token at login, readable with get_jwt()
+    if not current_app.config.get("JWT_EMBED_USER_CLAIMS", True):
+        return {}
+    return {"username": user.username}
+
+
+def invalidate_user(user_id):
+    if has_app_context() and "user_profiles" in current_app.extensions:
+        current_app.extensions["user_profiles"].delete(_profile_key(user_id))
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, user):
+    invalidate_user(user.id)
+    session = object_session(user)
+    if session is not None:
+        session.info.setdefault("changed_user_ids", set()).add(user.id) # Dropped again after commit
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    for user_id in session.info.pop("changed_user_ids", ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_users(session):
+    session.info.pop("changed_user_ids", None)
+
+
+class _SharedProfiles:
+    """The user profiles inside the shared (Redis) cache, with their own TTL."""
+
+    def __init__(self, cache_backend, ttl):
+        self._cache = cache_backend
+        self._ttl = ttl
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value):
+        self._cache.set(key, value, self._ttl)
+
+    def delete(self, *keys):
+        self._cache.delete(*keys)
+
+
+def register_identity_loaders(app):
+    ttl = app.config.get("USER_CACHE_TTL", 300)
+    if app.config.get("CACHE_BACKEND") == "redis":
+        # Every worker reads and invalidates the same copy (init_app of app.cache ran already)
+        app.extensions["user_profiles"] = _SharedProfiles(app.extensions["cache"], ttl)
+    else:
+        app.extensions["user_profiles"] = MemoryBackend(app.config.get("USER_CACHE_MAX_ENTRIES", 10000), ttl)
+
+    @jwt.user_lookup_loader
+    def load_user_profile(_jwt_header, jwt_data):
+        user_id = int(jwt_data["sub"])
+        profiles = current_app.extensions["user_profiles"]
+
+        profile = profiles.get(_profile_key(user_id))
+        if profile is None:
+            # Cache miss: fetch just the columns we need (no password hash in memory)
+            row = db.session.execute(
+                db.select(User.id, User.username, User.email, User.created_at).where(User.id == user_id)
+            ).first()
+            if row is None:
+                return None # Flask-JWT-Extended turns this into the error below
+            # JSON-friendly values only: the shared cache stores entries as JSON
+            profile = {"id": row.id, "username": row.username, "email": row.email,
+                       "created_at": row.created_at.isoformat() if row.created_at else None}
+            profiles.set(_profile_key(user_id), profile)
+        if profile["created_at"]:
+            profile = dict(profile, created_at=datetime.fromisoformat(profile["created_at"]))
+        return profile
+
+    # The token is valid, but the user it belongs to no longer exists
+    @jwt.user_lookup_error_loader
+    def user_not_found(_jwt_header, _jwt_data):
+        return jsonify({"error": "User not found"}), 401
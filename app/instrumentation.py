@@ -0,0 +1,240 @@
+"""
+Per-request timing and SQL instrumentation.
+
+For every request we record:
+- how many SQL statements ran and how long they took (SQLAlchemy engine events),
+- how long JSON serialization took (the app's JSON provider reports it),
+- the time spent in the handler itself and the total.
+
+That is sent back in a `Server-Timing` header (visible in the browser dev tools),
+aggregated into histograms served in Prometheus text format at /api/system/metrics,
+and any statement slower than SLOW_QUERY_THRESHOLD_MS is logged with a fingerprint
+of the statement and its parameters (types only, never the values).
+
+The bookkeeping is a few perf_counter() calls and one short lock per request,
+so it is cheap enough to leave switched on in production.
+Note: each gunicorn worker keeps its own numbers.
+"""
+
+# app/instrumentation.py
+import hashlib
+import logging
+import re
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request, request_started
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+
+from app.extensions import db
+
+logger = logging.getLogger("zomighty.sql")
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.label_names = label_names
+        self.series = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.help_text}")
+        lines.append(f"# TYPE {self.name} histogram")
+        for labels, series in sorted(self.series.items()):
+            base = ",".join(f'{name}="{value}"' for name, value in zip(self.label_names, labels))
+            sep = "," if base else ""
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {series[-1]}")
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.values = {}
+
+    def inc(self, labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.help_text}")
+        lines.append(f"# TYPE {self.name} counter")
+        for labels, value in sorted(self.values.items()):
+            base = ",".join(f'{name}="{value}"' for name, value in zip(self.label_names, labels))
+            lines.append(f"{self.name}{{{base}}} {value}")
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        labels = ("method", "endpoint")
+        self.request_duration = Histogram(
+            "http_request_duration_seconds", "Total time to handle a request", REQUEST_BUCKETS, labels)
+        self.request_db_time = Histogram(
+            "http_request_db_seconds", "Time spent in SQL per request", REQUEST_BUCKETS, labels)
+        self.request_serialize_time = Histogram(
+            "http_request_serialize_seconds", "Time spent serializing JSON per request", REQUEST_BUCKETS, labels)
+        self.request_queries = Histogram(
+            "http_request_db_queries", "SQL statements per request", COUNT_BUCKETS, labels)
+        self.query_duration = Histogram(
+            "db_query_duration_seconds", "Duration of single SQL statements", QUERY_BUCKETS, ())
+        self.requests = Counter("http_requests_total", "Requests handled", ("method", "endpoint", "status"))
+        self.slow_queries = Counter("db_slow_queries_total", "Statements slower than the threshold", ())
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for metric in (self.requests, self.request_duration, self.request_db_time,
+                           self.request_serialize_time, self.request_queries,
+                           self.query_duration, self.slow_queries):
+                metric.render(lines)
+        return "\n".join(lines) + "\n"
+
+
+# --- SQL FINGERPRINTS ---
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*(?:\?|%s|:\w+)(?:\s*,\s*(?:\?|%s|:\w+))*\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_statement(statement):
+    # "SELECT ... WHERE id IN (?, ?, ?) AND x = 5" -> "SELECT ... WHERE id IN (?+) AND x = ?"
+    statement = _LITERAL_RE.sub("?", statement)
+    statement = _IN_LIST_RE.sub("(?+)", statement)
+    return _SPACE_RE.sub(" ", statement).strip()
+
+
+def fingerprint(statement, parameters, executemany=False):
+    # The shape of the parameters (their types), so the same query with different values groups together
+    rows = ""
+    if executemany and parameters:
+        rows = f" x{len(parameters)}"
+        parameters = parameters[0] # executemany: every row has the same shape
+    if isinstance(parameters, dict):
+        shape = ",".join(f"{key}:{type(value).__name__}" for key, value in sorted(parameters.items()))
+    elif isinstance(parameters, (list, tuple)):
+        shape = ",".join(type(value).__name__ for value in parameters)
+    else:
+        shape = ""
+    normalized = normalize_statement(statement)
+    digest = hashlib.sha1(f"{normalized}|{shape}".encode()).hexdigest()[:12]
+    return digest, normalized, shape + rows
+
+
+# --- JSON SERIALIZATION TIMING ---
+def record_serialization(seconds):
+    if has_request_context() and "metrics" in g:
+        g.metrics["serialize"] += seconds
+
+
+class InstrumentedJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            record_serialization(time.perf_counter() - started)
+
+
+# --- WIRING ---
+def init_instrumentation(app):
+    if not app.config.get("INSTRUMENTATION_ENABLED", True):
+        return
+
+    metrics = Metrics()
+    app.extensions["metrics"] = metrics
+    slow_threshold = app.config.get("SLOW_QUERY_THRESHOLD_MS", 200) / 1000.0
+    server_timing = app.config.get("SERVER_TIMING_HEADER", True)
+
+    if isinstance(app.json, DefaultJSONProvider) and not isinstance(app.json, InstrumentedJSONProvider):
+        app.json = InstrumentedJSONProvider(app)
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+
+        if has_request_context() and "metrics" in g:
+            g.metrics["queries"] += 1
+            g.metrics["db"] += elapsed
+
+        slow = elapsed >= slow_threshold
+        with metrics.lock:
+            metrics.query_duration.observe((), elapsed)
+            if slow:
+                metrics.slow_queries.inc(())
+        if slow:
+            digest, normalized, shape = fingerprint(statement, parameters, executemany)
+            logger.warning("slow query %.1fms fingerprint=%s params=[%s] sql=%s",
+                           elapsed * 1000, digest, shape, normalized)
+
+    @event.listens_for(engine, "handle_error")
+    def _query_failed(exception_context):
+        # The statement blew up, so after_cursor_execute won't run: drop its start time
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
+
+    def _start_timer(sender, **extra):
+        g.metrics = {"started": time.perf_counter(), "queries": 0, "db": 0.0, "serialize": 0.0}
+
+    # weak=False: the receiver is a closure and would be garbage collected otherwise
+    request_started.connect(_start_timer, app, weak=False)
+
+    @app.after_request
+    def _finish_timer(response):
+        data = g.pop("metrics", None)
+        if data is None:
+            return response
+
+        total = time.perf_counter() - data["started"]
+        handler = max(total - data["db"] - data["serialize"], 0.0)
+        labels = (request.method, request.endpoint or "unknown")
+
+        with metrics.lock:
+            metrics.requests.inc(labels + (str(response.status_code),))
+            metrics.request_duration.observe(labels, total)
+            metrics.request_db_time.observe(labels, data["db"])
+            metrics.request_serialize_time.observe(labels, data["serialize"])
+            metrics.request_queries.observe(labels, data["queries"])
+
+        if server_timing:
+            response.headers["Server-Timing"] = (
+                f'db;dur={data["db"] * 1000:.2f};desc="{data["queries"]} queries", '
+                f'serialize;dur={data["serialize"] * 1000:.2f}, '
+                f'app;dur={handler * 1000:.2f}, '
+                f'total;dur={total * 1000:.2f}'
+            )
+        return response
+
+
+def render_metrics():
+    metrics = current_app.extensions.get("metrics")
+    return metrics.render() if metrics else ""
@@ -0,0 +1,74 @@
+"""The original schema: users, addresses, restaurants, menu items, orders and their lines."""
+
+# app/migrations/0001_initial.py
+import sqlalchemy as sa
+
+from app.migrations.ops import create_table
+
+metadata = sa.MetaData()
+
+users = sa.Table(
+    "users", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("username", sa.String(80), nullable=False),
+    sa.Column("email", sa.String(120), nullable=False),
+    sa.Column("password_hash", sa.String(256), nullable=False),
+    sa.Column("created_at", sa.DateTime),
+    sa.Index("ix_users_username", "username", unique=True),
+    sa.Index("ix_users_email", "email", unique=True),
+)
+
+addresses = sa.Table(
+    "addresses", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+    sa.Column("street", sa.String(120), nullable=False),
+    sa.Column("city", sa.String(120), nullable=False),
+    sa.Column("state", sa.String(120), nullable=False),
+    sa.Column("zip_code", sa.String(20), nullable=False),
+)
+
+restaurants = sa.Table(
+    "restaurants", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("name", sa.String(120), nullable=False),
+    sa.Column("description", sa.Text),
+    sa.Column("address", sa.String(200), nullable=False),
+    sa.Column("image_url", sa.String(255)),
+)
+
+menu_items = sa.Table(
+    "menu_items", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("name", sa.String(120), nullable=False),
+    sa.Column("description", sa.String(255)),
+    sa.Column("price", sa.Numeric(10, 2), nullable=False),
+    sa.Column("is_active", sa.Boolean),
+    sa.Column("restaurant_id", sa.Integer, sa.ForeignKey("restaurants.id"), nullable=False),
+)
+
+orders = sa.Table(
+    "orders", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+    sa.Column("restaurant_id", sa.Integer, sa.ForeignKey("restaurants.id"), nullable=False),
+    sa.Column("status", sa.String(20)),
+    sa.Column("total_price", sa.Numeric(10, 2)),
+    sa.Column("created_at", sa.DateTime),
+)
+
+order_items = sa.Table(
+    "order_items", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("order_id", sa.Integer, sa.ForeignKey("orders.id"), nullable=False),
+    sa.Column("menu_item_id", sa.Integer, sa.ForeignKey("menu_items.id"), nullable=False),
+    sa.Column("price_at_order", sa.Numeric(10, 2), nullable=False),
+    sa.Column("quantity", sa.Integer, nullable=False),
+    sa.Column("item_name", sa.String(120), nullable=False),
+)
+
+
+def upgrade(connection):
+    # Tables that already exist (databases made by the old db.create_all() in run.py) are kept
+    for table in metadata.sorted_tables:
+        create_table(connection, table)
@@ -0,0 +1,62 @@
+"""
+Everything added on top of the original schema so far:
+- restaurants.version / updated_at and menu_items.updated_at (ETags, bulk imports),
+- orders.version (optimistic status updates),
+- indexes for menus, order lines, order history and reporting exports,
+- the restaurant_daily_sales rollups and the idempotency_keys table.
+"""
+
+# app/migrations/0002_versions_indexes_reporting.py
+import sqlalchemy as sa
+
+from app.migrations.ops import add_column, create_index, create_table
+
+metadata = sa.MetaData()
+
+# Only referenced by the foreign key below (already exists)
+restaurants = sa.Table("restaurants", metadata, sa.Column("id", sa.Integer, primary_key=True))
+
+restaurant_daily_sales = sa.Table(
+    "restaurant_daily_sales", metadata,
+    sa.Column("restaurant_id", sa.Integer, sa.ForeignKey("restaurants.id"), primary_key=True),
+    sa.Column("day", sa.Date, primary_key=True),
+    sa.Column("order_count", sa.Integer, nullable=False),
+    sa.Column("revenue", sa.Numeric(12, 2), nullable=False),
+    sa.Column("delivered_count", sa.Integer, nullable=False),
+    sa.Column("delivered_revenue", sa.Numeric(12, 2), nullable=False),
+    sa.Column("cancelled_count", sa.Integer, nullable=False),
+    sa.Column("cancelled_revenue", sa.Numeric(12, 2), nullable=False),
+    sa.Index("ix_restaurant_daily_sales_day", "day"),
+)
+
+idempotency_keys = sa.Table(
+    "idempotency_keys", metadata,
+    sa.Column("user_id", sa.Integer, primary_key=True),
+    sa.Column("key", sa.String(255), primary_key=True),
+    sa.Column("request_hash", sa.String(64), nullable=False),
+    sa.Column("status_code", sa.Integer),
+    sa.Column("mimetype", sa.String(100)),
+    sa.Column("body", sa.LargeBinary),
+    sa.Column("created_at", sa.DateTime, nullable=False),
+    sa.Column("expires_at", sa.DateTime, nullable=False),
+    sa.Index("ix_idempotency_keys_expires_at", "expires_at"),
+)
+
+
+def upgrade(connection):
+    # 1. New columns (existing rows start at version 1)
+    add_column(connection, "restaurants", sa.Column("version", sa.Integer, nullable=False, server_default="1"))
+    add_column(connection, "restaurants", sa.Column("updated_at", sa.DateTime))
+    add_column(connection, "menu_items", sa.Column("updated_at", sa.DateTime))
+    add_column(connection, "orders", sa.Column("version", sa.Integer, nullable=False, server_default="1"))
+
+    # 2. Indexes
+    create_index(connection, "ix_menu_items_restaurant_id", "menu_items", "restaurant_id")
+    create_index(connection, "ix_order_items_order_id", "order_items", "order_id")
+    create_index(connection, "ix_orders_user_created", "orders", "user_id", "created_at", "id")
+    create_index(connection, "ix_orders_created", "orders", "created_at", "id")
+    create_index(connection, "ix_orders_restaurant_created", "orders", "restaurant_id", "created_at", "id")
+
+    # 3. New tables
+    create_table(connection, restaurant_daily_sales)
+    create_table(connection, idempotency_keys)
@@ -0,0 +1,17 @@
+"""Coordinates (and a geohash index) on restaurants, coordinates on addresses."""
+
+# app/migrations/0003_geolocation.py
+import sqlalchemy as sa
+
+from app.migrations.ops import add_column, create_index
+
+
+def upgrade(connection):
+    add_column(connection, "restaurants", sa.Column("latitude", sa.Float))
+    add_column(connection, "restaurants", sa.Column("longitude", sa.Float))
+    add_column(connection, "restaurants", sa.Column("geohash", sa.String(12)))
+    add_column(connection, "restaurants", sa.Column("delivery_radius_km", sa.Float))
+    create_index(connection, "ix_restaurants_geo", "restaurants", "geohash", "latitude", "longitude")
+
+    add_column(connection, "addresses", sa.Column("latitude", sa.Float))
+    add_column(connection, "addresses", sa.Column("longitude", sa.Float))
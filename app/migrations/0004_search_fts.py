@@ -0,0 +1,39 @@
+"""
+The full-text search table (SQLite only, see SqliteFtsBackend in app/search.py), filled from
+the existing catalog. Made here, once per deploy, and not by whichever web request searches
+first: several workers starting together would race on creating and filling it.
+
+Other databases, and SQLite builds without FTS5, have no such table: they search with the
+in-process index instead.
+"""
+
+# app/migrations/0004_search_fts.py
+import sqlalchemy as sa
+from sqlalchemy.exc import OperationalError
+
+from app.migrations.ops import has_table
+
+TABLE = "restaurant_search"
+
+
+def upgrade(connection):
+    if connection.dialect.name != "sqlite" or has_table(connection, TABLE):
+        return
+
+    # 1. The table (a savepoint: without FTS5 the statement fails and the rest must still commit)
+    try:
+        with connection.begin_nested():
+            connection.execute(sa.text(
+                f"CREATE VIRTUAL TABLE {TABLE} USING fts5(name, description, menu, tokenize='unicode61')"
+            ))
+    except OperationalError:
+        return # No FTS5 in this SQLite build
+
+    # 2. One document per restaurant: its name, description and active menu item names
+    connection.execute(sa.text(f"""
+        INSERT INTO {TABLE} (rowid, name, description, menu)
+        SELECT r.id, r.name, COALESCE(r.description, ''),
+               COALESCE((SELECT group_concat(m.name, ' ') FROM menu_items m
+                         WHERE m.restaurant_id = r.id AND (m.is_active IS NULL OR m.is_active != 0)), '')
+        FROM restaurants r
+    """))
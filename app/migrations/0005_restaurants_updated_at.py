@@ -0,0 +1,8 @@
+"""An index on restaurants.updated_at: the in-process search index asks what changed since a time."""
+
+# app/migrations/0005_restaurants_updated_at.py
+from app.migrations.ops import create_index
+
+
+def upgrade(connection):
+    create_index(connection, "ix_restaurants_updated_at", "restaurants", "updated_at")
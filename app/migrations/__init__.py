@@ -0,0 +1,89 @@
+"""
+Versioned database migrations.
+
+The schema is no longer created when the app starts. It is changed explicitly, once per deploy:
+
+    flask --app run db upgrade      # apply every migration that hasn't run yet
+    flask --app run db current      # which version the database is at
+
+Every file in this folder named NNNN_description.py is one migration with an
+`upgrade(connection)` function. They run in order, each in its own transaction, and the
+numbers of the ones that ran are recorded in the schema_version table.
+
+To change the schema: change app/models.py AND add the next NNNN_... file doing the same
+thing to an existing database (see app/migrations/ops.py for helpers).
+
+Databases made before migrations existed (run.py called db.create_all() and
+app/schema.py's add_missing_columns() on every start) are adopted by `flask --app run db upgrade`:
+every step checks the live schema first, so whatever is already there is kept and only
+what is missing is added.
+"""
+
+# app/migrations/__init__.py
+import importlib
+import os
+import re
+from datetime import datetime
+
+import sqlalchemy as sa
+
+MIGRATIONS_DIR = os.path.dirname(__file__)
+FILENAME_RE = re.compile(r"^(\d{4})_(\w+)\.py$")
+
+schema_version = sa.Table(
+    "schema_version", sa.MetaData(),
+    sa.Column("version", sa.Integer, primary_key=True),
+    sa.Column("name", sa.String(200), nullable=False),
+    sa.Column("applied_at", sa.DateTime, nullable=False),
+)
+
+
+def discover():
+    # [(version, name)] for every migration file, in order
+    found = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = FILENAME_RE.match(filename)
+        if match:
+            found.append((int(match.group(1)), match.group(2)))
+    found.sort()
+    versions = [version for version, _name in found]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError("Two migrations share the same number")
+    return found
+
+
+def _load(version, name):
+    return importlib.import_module(f"{__name__}.{version:04d}_{name}")
+
+
+def applied_versions(connection):
+    schema_version.create(connection, checkfirst=True)
+    return {row.version for row in connection.execute(sa.select(schema_version.c.version))}
+
+
+def current_version(engine):
+    with engine.begin() as connection:
+        return max(applied_versions(connection), default=0)
+
+
+def upgrade(engine, target=None, log=print):
+    """Apply the pending migrations up to `target` (default: all). Returns the versions applied."""
+    with engine.begin() as connection:
+        done = applied_versions(connection)
+
+    applied = []
+    for version, name in discover():
+        if version in done:
+            continue
+        if target is not None and version > target:
+            break
+        module = _load(version, name)
+        log(f"Applying {version:04d}_{name} ...")
+        # One transaction per migration (note: MySQL commits DDL statements immediately)
+        with engine.begin() as connection:
+            module.upgrade(connection)
+            connection.execute(schema_version.insert().values(
+                version=version, name=name, applied_at=datetime.utcnow()
+            ))
+        applied.append(version)
+    return applied
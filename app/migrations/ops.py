@@ -0,0 +1,46 @@
+"""
+Small helpers for writing migrations.
+
+They all check the live schema first and do nothing if the change is already there,
+so a database that was created with db.create_all() before migrations existed can be
+upgraded safely.
+"""
+
+# app/migrations/ops.py
+import sqlalchemy as sa
+from sqlalchemy.schema import CreateColumn
+
+
+def has_table(connection, table_name):
+    return sa.inspect(connection).has_table(table_name)
+
+
+def has_column(connection, table_name, column_name):
+    return any(column["name"] == column_name for column in sa.inspect(connection).get_columns(table_name))
+
+
+def has_index(connection, table_name, index_name):
+    return any(index["name"] == index_name for index in sa.inspect(connection).get_indexes(table_name))
+
+
+def create_table(connection, table):
+    # `table` is a sa.Table defined in the migration (never the model: models change over time)
+    table.create(connection, checkfirst=True)
+    for index in table.indexes:
+        if not has_index(connection, table.name, index.name):
+            index.create(connection)
+
+
+def add_column(connection, table_name, column):
+    # Adding a NOT NULL column to a table with rows needs a server_default
+    if has_column(connection, table_name, column.name):
+        return
+    ddl = CreateColumn(column).compile(dialect=connection.dialect)
+    connection.execute(sa.text(f"ALTER TABLE {table_name} ADD COLUMN {ddl}"))
+
+
+def create_index(connection, index_name, table_name, *column_names, unique=False):
+    if has_index(connection, table_name, index_name):
+        return
+    table = sa.Table(table_name, sa.MetaData(), *[sa.Column(name) for name in column_names])
+    sa.Index(index_name, *[table.c[name] for name in column_names], unique=unique).create(connection)
@@ -9,8 +9,8 @@ It also includes methods for password hashing and verification to ensure secure
 
 # app/models.py
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash #password hashing utilities
 from app.extensions import db  # <--- IMPORT FROM EXTENSIONS
+from app.hashing import password_hasher # Hashes passwords in a separate process pool (see app/hashing.py)
 
 # --- User & Authentication Models ---
 
@@ -29,10 +29,14 @@ class User(db.Model):
     # lazy=True means addresses are loaded only when we access user.addresses, not every time we load a user.
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        # True if this hash was made with an older cost than Config.PASSWORD_HASH_METHOD
+        return password_hasher.needs_rehash(self.password_hash)
 
     def __repr__(self):
         return f'<User {self.username}>'
@@ -48,17 +52,37 @@ class Address(db.Model):
     state = db.Column(db.String(120), nullable=False)
     zip_code = db.Column(db.String(20), nullable=False) # Renamed 'zip' (reserved keyword)
 
+    # Where it is, so we can find the restaurants that deliver here (see app/geo.py)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+
 
 # --- Restaurant & Menu Models ---
 
 class Restaurant(db.Model):
     __tablename__ = 'restaurants'
+    __table_args__ = (
+        # "Restaurants near me": range scans per geohash cell, with the coordinates in the index
+        # so the bounding box is checked without reading the rows (see app/geo.py)
+        db.Index('ix_restaurants_geo', 'geohash', 'latitude', 'longitude'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
     description = db.Column(db.Text, nullable=True)
     address = db.Column(db.String(200), nullable=False)
     image_url = db.Column(db.String(255))
+
+    # Location: set latitude/longitude together with geohash = geo.encode(latitude, longitude)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    geohash = db.Column(db.String(12))
+    delivery_radius_km = db.Column(db.Float) # NULL = Config.GEO_DEFAULT_DELIVERY_RADIUS_KM
+
+    # Bumped on EVERY change to the restaurant or its menu, so clients (and caches)
+    # can tell "has anything changed?" without downloading the whole menu again.
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True) # Index: the search index catches up on what changed since
     
     # Relationships
     # cascade="all, delete-orphan" means if you delete a Restaurant, 
@@ -75,8 +99,9 @@ class MenuItem(db.Model):
     # CHANGED Float to Numeric for money precision
     price = db.Column(db.Numeric(10, 2), nullable=False) 
     is_active = db.Column(db.Boolean, default=True) # Good to soft-delete items
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurants.id'), nullable=False)
+    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurants.id'), nullable=False, index=True) # Index: menus are looked up by restaurant
 
 
 
@@ -88,6 +113,13 @@ class MenuItem(db.Model):
 
 class Order(db.Model):
     __tablename__ = 'orders'
+    __table_args__ = (
+        # "My orders, newest first" (and its keyset cursor) walks this index instead of the whole table
+        db.Index('ix_orders_user_created', 'user_id', 'created_at', 'id'),
+        # Reporting exports by date range, and by restaurant + date range
+        db.Index('ix_orders_created', 'created_at', 'id'),
+        db.Index('ix_orders_restaurant_created', 'restaurant_id', 'created_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     
@@ -97,8 +129,11 @@ class Order(db.Model):
     # Which restaurant is it from?
     restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurants.id'), nullable=False)
     
-    # Status: pending, preparing, delivered, cancelled
+    # Status: pending, preparing, delivered, cancelled (allowed moves: app/order_status.py)
     status = db.Column(db.String(20), default='pending')
+
+    # Goes up by one on every status change, so two updates can't silently overwrite each other
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     
     # Total Price (Cached here for speed)
     total_price = db.Column(db.Numeric(10, 2), default=0.00)
@@ -116,7 +151,7 @@ class OrderItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     
     # Link to the Order Header
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True) # Index: items are looked up by order
     
     # Link to the original Menu Item (so we know it was a Whopper)
     menu_item_id = db.Column(db.Integer, db.ForeignKey('menu_items.id'), nullable=False)
@@ -124,4 +159,40 @@ class OrderItem(db.Model):
     # Snapshot of the data at the moment of purchase
     price_at_order = db.Column(db.Numeric(10, 2), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
-    item_name = db.Column(db.String(120), nullable=False) # Store name too in case MenuItem is deleted
\ No newline at end of file
+    item_name = db.Column(db.String(120), nullable=False) # Store name too in case MenuItem is deleted
+
+# --- Reporting ---
+
+class RestaurantDailySales(db.Model):
+    # One row per restaurant per day, kept up to date by the order routes (see app/analytics.py)
+    # so dashboards never have to aggregate the raw orders.
+    __tablename__ = 'restaurant_daily_sales'
+
+    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurants.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True, index=True) # The day the orders were placed (UTC); index: all-restaurant dashboards
+
+    # Every order placed that day, whatever happened to it later
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+
+    # Of those: how many ended up delivered / cancelled
+    delivered_count = db.Column(db.Integer, nullable=False, default=0)
+    delivered_revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    cancelled_count = db.Column(db.Integer, nullable=False, default=0)
+    cancelled_revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+
+
+# --- Request de-duplication ---
+
+class IdempotencyKey(db.Model):
+    # The stored outcome of a request sent with an Idempotency-Key header (see app/idempotency.py)
+    __tablename__ = 'idempotency_keys'
+
+    user_id = db.Column(db.Integer, primary_key=True)   # Keys are per user: two users may pick the same key
+    key = db.Column(db.String(255), primary_key=True)
+    request_hash = db.Column(db.String(64), nullable=False) # The same key must come with the same request
+    status_code = db.Column(db.Integer)                   # NULL while the first request is still running
+    mimetype = db.Column(db.String(100))
+    body = db.Column(db.LargeBinary)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True) # Index: expired keys are deleted in bulk
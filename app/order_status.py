@@ -0,0 +1,134 @@
+"""
+The order life cycle, and status updates that can't overwrite each other.
+
+    pending ──> preparing ──> delivered
+       │            │
+       └────────────┴──────> cancelled
+
+TRANSITIONS declares which status may follow which; delivered and cancelled are final.
+
+Every order has a `version` that goes up by one on each status change. An update is ONE
+conditional statement, without loading the order first:
+
+    UPDATE orders SET status = :new, version = version + 1
+    WHERE id IN (...) AND status IN (<statuses allowed to move to :new>) [AND version = :seen]
+
+If the kitchen and the courier update the same order at the same moment, the database
+lets one of them match and the other matches nothing (and gets a 409) instead of silently
+overwriting the first one's change.
+
+Who may change what: ORDER_STAFF_USER_IDS any order, everyone else only their own (the
+user_id argument below). Someone else's order is "not found", without its status or version.
+Customers may only cancel an order that is still pending (CUSTOMER_TRANSITIONS): marking it
+preparing or delivered is the restaurant's job (and delivered orders count in the sales figures).
+"""
+
+# app/order_status.py
+from types import SimpleNamespace
+
+from app.extensions import db
+from app.models import Order
+
+TRANSITIONS = {
+    'pending': ('preparing', 'cancelled'),
+    'preparing': ('delivered', 'cancelled'),
+    'delivered': (),
+    'cancelled': (),
+}
+
+STATUSES = tuple(TRANSITIONS)
+
+# The only move an order's own customer may make (staff use TRANSITIONS)
+CUSTOMER_TRANSITIONS = {
+    'pending': ('cancelled',),
+}
+
+# What the callers get back for every updated order (also what analytics & events need)
+RETURNED_COLUMNS = (Order.id, Order.user_id, Order.restaurant_id, Order.status, Order.version,
+                    Order.total_price, Order.created_at)
+
+
+def transitions_for(user_id):
+    # user_id None = staff (see change_status)
+    return TRANSITIONS if user_id is None else CUSTOMER_TRANSITIONS
+
+
+def can_move(old_status, new_status, transitions=TRANSITIONS):
+    return new_status in transitions.get(old_status, ())
+
+
+def sources_for(new_status, transitions=TRANSITIONS):
+    # The statuses an order may be in to move to new_status
+    return [status for status, targets in transitions.items() if new_status in targets]
+
+
+def change_status(new_status, ids=(), versions=None, restaurant_id=None, user_id=None):
+    """
+    Move orders to new_status with one UPDATE, inside the current transaction (caller commits).
+    - ids: orders to move whatever their version,
+    - versions: {order_id: version the caller last saw}, moved only if still at that version,
+    - restaurant_id: only orders of this restaurant,
+    - user_id: only orders of this user, and only the CUSTOMER_TRANSITIONS (None: any order, for staff).
+    Returns the rows of the orders that were actually updated (RETURNED_COLUMNS, new values).
+    """
+    versions = versions or {}
+    matches = []
+    if ids:
+        matches.append(Order.id.in_(ids))
+    matches.extend(db.and_(Order.id == order_id, Order.version == version) for order_id, version in versions.items())
+    if not matches:
+        return []
+
+    criteria = [db.or_(*matches), Order.status.in_(sources_for(new_status, transitions_for(user_id)))]
+    if restaurant_id is not None:
+        criteria.append(Order.restaurant_id == restaurant_id)
+    if user_id is not None:
+        criteria.append(Order.user_id == user_id)
+    values = {"status": new_status, "version": Order.version + 1}
+
+    if db.session.get_bind().dialect.update_returning:
+        # SQLite 3.35+, PostgreSQL, MariaDB: the changed rows come back with the UPDATE itself
+        statement = (
+            db.update(Order).where(*criteria).values(**values)
+            .returning(*RETURNED_COLUMNS)
+            .execution_options(synchronize_session=False)
+        )
+        return db.session.execute(statement).all()
+
+    # MySQL has no UPDATE ... RETURNING: lock the matching rows, then update exactly those
+    rows = db.session.execute(db.select(*RETURNED_COLUMNS).where(*criteria).with_for_update()).all()
+    if not rows:
+        return []
+    db.session.execute(
+        db.update(Order).where(Order.id.in_([row.id for row in rows])).values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    return [SimpleNamespace(**dict(row._asdict(), status=new_status, version=row.version + 1)) for row in rows]
+
+
+def explain_skipped(order_ids, new_status, versions=None, restaurant_id=None, user_id=None):
+    # Why were these orders not updated? Only runs when something was skipped.
+    # With user_id, other users' orders are left out of the query: they look exactly like missing ones.
+    versions = versions or {}
+    query = db.select(Order.id, Order.status, Order.version, Order.restaurant_id).where(Order.id.in_(order_ids))
+    if user_id is not None:
+        query = query.where(Order.user_id == user_id)
+    found = {row.id: row for row in db.session.execute(query)}
+    reasons = {}
+    for order_id in order_ids:
+        row = found.get(order_id)
+        if row is None:
+            reasons[order_id] = {"id": order_id, "error": "Order not found"}
+        elif restaurant_id is not None and row.restaurant_id != restaurant_id:
+            reasons[order_id] = {"id": order_id, "error": "Order belongs to another restaurant"}
+        elif order_id in versions and row.version != versions[order_id]:
+            reasons[order_id] = {"id": order_id, "error": "Order was changed by someone else",
+                                 "status": row.status, "version": row.version}
+        elif not can_move(row.status, new_status, transitions_for(user_id)):
+            reasons[order_id] = {"id": order_id, "error": f"Cannot change status from {row.status} to {new_status}",
+                                 "status": row.status, "version": row.version}
+        else:
+            # It matched nothing a moment ago but would now: someone else just changed it
+            reasons[order_id] = {"id": order_id, "error": "Order was changed by someone else",
+                                 "status": row.status, "version": row.version}
+    return reasons
@@ -0,0 +1,62 @@
+"""
+Helpers for keyset ("cursor") pagination.
+
+Instead of OFFSET (which gets slower the deeper you page), a cursor remembers
+the sort key of the last row the client saw, and the next page simply asks
+for rows that come after it: WHERE id > :last_id ORDER BY id LIMIT :limit.
+The cursor is sent to the client as an opaque URL-safe string.
+"""
+
+# app/pagination.py
+import base64
+import json
+
+from flask import request
+from werkzeug.exceptions import BadRequest
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+def cursor_mode_requested():
+    # Cursor mode is opt-in: ?cursor=... (empty for the first page) or ?limit=...
+    return 'cursor' in request.args or 'limit' in request.args
+
+
+def get_limit(default=DEFAULT_LIMIT):
+    limit = request.args.get('limit', default, type=int)
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def wants_total():
+    # COUNT(*) is the expensive part of classic pagination, so only run it on request
+    return request.args.get('include_total', '').lower() in ('1', 'true', 'yes')
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    # Returns the dict that was encoded, or None for "first page"
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise BadRequest('Invalid cursor')
+    if not isinstance(values, dict):
+        raise BadRequest('Invalid cursor')
+    return values
+
+
+def cursor_int(cursor, key, default=None):
+    # Read one integer out of a decoded cursor (clients can tamper with it, so check)
+    if key not in cursor:
+        return default
+    try:
+        return int(cursor[key])
+    except (TypeError, ValueError):
+        raise BadRequest('Invalid cursor')
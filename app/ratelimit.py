@@ -0,0 +1,274 @@
+"""
+Rate limiting and load shedding: turn bursts away before they reach the database.
+
+1. Rate limiting (429 Too Many Requests): every client gets a "token bucket" per rule.
+   The bucket holds up to N tokens and refills at N per period ("5/minute" = 5 tokens,
+   one more every 12 seconds). Each request takes a token; an empty bucket means 429
+   with a Retry-After header saying when the next token arrives. So a client can burst
+   N requests, but not keep going faster than the rate.
+   - The client is the JWT subject when the request carries a valid token, the IP otherwise.
+   - Rules come from RATELIMIT_RULES in Config, per endpoint ('auth.login') or per
+     blueprint ('auth'). The most specific rule wins; routes without a rule are not limited.
+   - MemoryBuckets keeps each bucket as a (tokens, timestamp) pair in a bounded LRU, in
+     this worker only (every worker grants the full rate). RedisBuckets is shared by all
+     workers (needs the optional `redis` package); if Redis is down, requests are let through.
+
+2. Load shedding (503 Service Unavailable): when more than LOAD_SHED_MAX_IN_FLIGHT requests
+   are already being handled by this worker, new ones are refused at once instead of piling
+   up behind the database. It only matters when a worker runs several requests at a time
+   (gunicorn threads or gevent). Long-lived requests (order event streams) and the system
+   endpoints are not counted, see LOAD_SHED_EXEMPT.
+
+Both checks run in before_request: no JWT user lookup, no SQL.
+Rejected requests show up in /api/system/metrics as http_requests_total{status="429"/"503"}.
+"""
+
+# app/ratelimit.py
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, g, request
+from flask_jwt_extended import decode_token
+from werkzeug.exceptions import ServiceUnavailable, TooManyRequests
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_rate(rule):
+    """'5/minute' -> (5, 60.0): a bucket of 5 tokens that refills completely in 60 seconds."""
+    try:
+        count, period = rule.strip().split("/")
+        count, seconds = int(count), PERIODS[period.strip().rstrip("s")]
+    except (ValueError, KeyError):
+        raise RuntimeError(f"Invalid rate limit {rule!r}, expected e.g. '5/minute'")
+    if count <= 0:
+        raise RuntimeError(f"Invalid rate limit {rule!r}, the count must be positive")
+    return count, float(seconds)
+
+
+class RateLimited(TooManyRequests):
+    description = "Too many requests, slow down"
+
+
+class Overloaded(ServiceUnavailable):
+    description = "The server is busy, please try again shortly"
+
+
+class MemoryBuckets:
+    def __init__(self, max_keys=50000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at), least recently used first
+
+    def take(self, key, capacity, period):
+        """Take one token. Returns (allowed, tokens left, seconds until the next token)."""
+        rate = capacity / period # Tokens per second
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = capacity
+            else:
+                tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                self._buckets.move_to_end(key)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            # Too many clients? Forget the one seen longest ago (it starts again with a full bucket)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, tokens, 0 if allowed else (1 - tokens) / rate
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+# Same algorithm as MemoryBuckets.take, run atomically inside Redis with Redis' clock
+# (so every worker agrees). The key expires once the bucket would be full again.
+_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local tokens = tonumber(bucket[1])
+if tokens == nil then
+    tokens = capacity
+else
+    tokens = math.min(capacity, tokens + math.max(0, now - tonumber(bucket[2])) * rate)
+end
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBuckets:
+    def __init__(self, url, prefix="zomighty:ratelimit:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RATELIMIT_BACKEND=redis needs the 'redis' package (pip install redis)")
+
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5)
+        self._take = self._client.register_script(_TAKE_SCRIPT)
+
+    def take(self, key, capacity, period):
+        rate = capacity / period
+        try:
+            allowed, tokens = self._take(keys=[self.prefix + key], args=[capacity, rate])
+        except Exception:
+            # A limiter that is down must not take logins and orders down with it
+            current_app.logger.warning("Rate limiter unavailable, letting the request through", exc_info=True)
+            return True, capacity, 0
+        tokens = float(tokens)
+        return bool(allowed), tokens, 0 if allowed else (1 - tokens) / rate
+
+    def clear(self):
+        keys = list(self._client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self._client.delete(*keys)
+
+
+class LoadShedder:
+    def __init__(self, max_in_flight):
+        self.max_in_flight = max_in_flight
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.shed = 0
+
+    def enter(self):
+        # False (and nothing counted) when the worker is already full
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                self.shed += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+
+class RateLimiter:
+    """The object create_app() plugs in; the bucket store is chosen from the config."""
+
+    def init_app(self, app):
+        # 1. Parse the rules once: {'auth.login': (5, 60.0), 'auth': (20, 60.0), ...}
+        rules = {}
+        for scope, rule in app.config.get("RATELIMIT_RULES", {}).items():
+            if rule:
+                rules[scope] = parse_rate(rule)
+        app.extensions["ratelimit_rules"] = rules
+
+        # 2. Where the buckets live
+        if app.config.get("RATELIMIT_ENABLED", True) and rules:
+            backend = app.config.get("RATELIMIT_BACKEND", "memory")
+            if backend == "memory":
+                app.extensions["ratelimit"] = MemoryBuckets(app.config.get("RATELIMIT_MAX_KEYS", 50000))
+            elif backend == "redis":
+                app.extensions["ratelimit"] = RedisBuckets(app.config["RATELIMIT_REDIS_URL"])
+            else:
+                raise RuntimeError(f"Unknown RATELIMIT_BACKEND: {backend}")
+
+        max_in_flight = app.config.get("LOAD_SHED_MAX_IN_FLIGHT", 0)
+        if max_in_flight > 0:
+            app.extensions["load_shedder"] = LoadShedder(max_in_flight)
+
+        # 3. The checks themselves (cheapest first)
+        app.before_request(_shed_load)
+        app.before_request(_check_rate_limit)
+        app.teardown_request(_release_slot)
+        app.after_request(_add_rate_limit_headers)
+
+    @property
+    def buckets(self):
+        return current_app.extensions.get("ratelimit")
+
+    def clear(self):
+        if self.buckets is not None:
+            self.buckets.clear()
+
+    def stats(self):
+        shedder = current_app.extensions.get("load_shedder")
+        return {
+            "rate_limit_backend": current_app.config.get("RATELIMIT_BACKEND", "memory") if self.buckets else "off",
+            "in_flight": shedder.in_flight if shedder else None,
+            "max_in_flight": shedder.max_in_flight if shedder else None,
+            "shed": shedder.shed if shedder else 0,
+        }
+
+
+def _rule_for_request():
+    # Most specific first: 'orders.place_order', then 'orders'
+    rules = current_app.extensions.get("ratelimit_rules", {})
+    if request.endpoint in rules:
+        return request.endpoint, rules[request.endpoint]
+    if request.blueprint in rules:
+        return request.blueprint, rules[request.blueprint]
+    return None, None
+
+
+def client_identity():
+    """'user:<sub>' for a valid Bearer token (checked without loading the user), else 'ip:<address>'."""
+    header = request.headers.get("Authorization", "")
+    if header.startswith("Bearer "):
+        try:
+            return f"user:{decode_token(header[7:])['sub']}"
+        except Exception:
+            pass # Expired or forged: the view will answer 401, meanwhile count it against the IP
+    # Behind a proxy remote_addr is the proxy: wrap the app in werkzeug's ProxyFix there
+    return f"ip:{request.remote_addr}"
+
+
+def _shed_load():
+    shedder = current_app.extensions.get("load_shedder")
+    exempt = current_app.config.get("LOAD_SHED_EXEMPT", ())
+    if shedder is None or request.endpoint in exempt or request.blueprint in exempt:
+        return
+    if not shedder.enter():
+        raise Overloaded(retry_after=1)
+    g.load_shed_slot = True
+
+
+def _release_slot(exception):
+    if g.pop("load_shed_slot", False):
+        current_app.extensions["load_shedder"].leave()
+
+
+def _check_rate_limit():
+    buckets = current_app.extensions.get("ratelimit")
+    if buckets is None or request.method == "OPTIONS": # CORS preflights are free
+        return
+    scope, rule = _rule_for_request()
+    if rule is None:
+        return
+
+    capacity, period = rule
+    allowed, tokens, retry_after = buckets.take(f"{scope}:{client_identity()}", capacity, period)
+    g.rate_limit = (capacity, int(tokens))
+    if not allowed:
+        raise RateLimited(retry_after=max(1, math.ceil(retry_after)))
+
+
+def _add_rate_limit_headers(response):
+    # Let well-behaved clients slow down before they hit the limit
+    rate_limit = g.pop("rate_limit", None)
+    if rate_limit is not None:
+        response.headers["RateLimit-Limit"] = str(rate_limit[0])
+        response.headers["RateLimit-Remaining"] = str(rate_limit[1])
+    return response
+
+
+rate_limiter = RateLimiter()
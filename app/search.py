@@ -0,0 +1,329 @@
+"""
+Full-text search over the restaurant catalog.
+
+Every restaurant is indexed as one "document" made of three fields:
+its name, its description and the names of its menu items.
+Searching for "marg piz" finds "Pizza Hut" because it sells a "Margherita".
+
+Two backends do the actual work:
+- SQLite databases use an FTS5 virtual table (ranked with bm25), created and filled by
+  migration 0004 (app/migrations/0004_search_fts.py).
+- Every other database (e.g. MySQL) uses an in-process inverted index per worker.
+  It is updated right away by the writes of its own worker, and a background thread picks
+  up writes made by other workers or by `flask catalog import` every SEARCH_REFRESH_INTERVAL
+  seconds: it reads only the restaurants whose updated_at moved since its last look.
+"""
+
+# app/search.py
+import math
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app.extensions import db
+from app.models import Restaurant, MenuItem
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# How much a match in each field counts towards the ranking (name matters most)
+FIELD_WEIGHTS = {"name": 10.0, "description": 2.0, "menu": 5.0}
+
+# updated_at is set from the clock of whichever process wrote the row, and those clocks may
+# differ a little: every refresh also looks again at the rows of the last minute
+WATERMARK_OVERLAP = timedelta(seconds=60)
+
+
+def tokenize(value):
+    # "Pizza-Hut's Deep Dish" -> ['pizza', 'hut', 's', 'deep', 'dish']
+    return [token.lower() for token in TOKEN_RE.findall(value or "")]
+
+
+class Document:
+    __slots__ = ("id", "version", "name", "description", "menu")
+
+    def __init__(self, row, menu):
+        self.id, self.version, self.name, self.description = row.id, row.version, row.name, row.description
+        self.menu = menu
+
+
+def _documents(restaurant_ids=None):
+    # Returns a Document (id, version, name, description, menu_text) for every restaurant (or only
+    # the given ones) with TWO queries: the restaurants, then all their active menu item names.
+    # (Plain SQL on every database: no group_concat / string_agg, no length limits.)
+    restaurants = db.select(Restaurant.id, Restaurant.version, Restaurant.name, Restaurant.description)
+    items = (
+        db.select(MenuItem.restaurant_id, MenuItem.name)
+        .where(MenuItem.is_active.isnot(False))
+        .order_by(MenuItem.restaurant_id, MenuItem.id)
+    )
+    if restaurant_ids is not None:
+        restaurants = restaurants.where(Restaurant.id.in_(restaurant_ids))
+        items = items.where(MenuItem.restaurant_id.in_(restaurant_ids))
+
+    menus = {}
+    for item in db.session.execute(items):
+        menus.setdefault(item.restaurant_id, []).append(item.name)
+    return [Document(row, " ".join(menus.get(row.id, ()))) for row in db.session.execute(restaurants)]
+
+
+class SqliteFtsBackend:
+    """Stores the index in an FTS5 table next to the real tables."""
+
+    name = "fts5"
+    table = "restaurant_search"
+
+    @classmethod
+    def available(cls):
+        # The table is created and filled by migration 0004 (`flask --app run db upgrade`)
+        exists = db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": cls.table}
+        ).first()
+        db.session.commit()
+        return exists is not None
+
+    def setup(self):
+        if not self.available():
+            raise RuntimeError(f"The {self.table} table is missing: run `flask --app run db upgrade` "
+                               "(it is only created where SQLite has FTS5)")
+
+    def _write(self, documents):
+        rows = [
+            {"id": doc.id, "name": doc.name, "description": doc.description or "", "menu": doc.menu or ""}
+            for doc in documents
+        ]
+        if rows:
+            db.session.execute(text(
+                f"INSERT INTO {self.table} (rowid, name, description, menu) "
+                "VALUES (:id, :name, :description, :menu)"
+            ), rows)
+
+    def reindex(self, restaurant_ids):
+        db.session.execute(
+            text(f"DELETE FROM {self.table} WHERE rowid IN ({', '.join(str(int(i)) for i in restaurant_ids)})")
+        )
+        self._write(_documents(restaurant_ids))
+        db.session.commit()
+
+    def rebuild(self):
+        db.session.execute(text(f"DELETE FROM {self.table}"))
+        self._write(_documents())
+        db.session.commit()
+
+    def search(self, tokens, limit):
+        # '"pizz"* "hut"*' means: a word starting with pizz AND a word starting with hut
+        match = " ".join(f'"{token}"*' for token in tokens)
+        weights = ", ".join(str(FIELD_WEIGHTS[field]) for field in ("name", "description", "menu"))
+        rows = db.session.execute(text(
+            f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH :match "
+            f"ORDER BY bm25({self.table}, {weights}) LIMIT :limit"
+        ), {"match": match, "limit": limit})
+        return [row[0] for row in rows]
+
+
+class InMemoryBackend:
+    """
+    A classic inverted index: token -> {restaurant_id: score}.
+    The vocabulary is kept sorted so prefix lookups ("piz" -> pizza, pizzeria)
+    are a binary search instead of a scan over every token.
+    """
+
+    name = "memory"
+
+    def __init__(self, refresh_interval=5):
+        self._lock = threading.RLock()
+        self._postings = {}     # token -> {restaurant_id: weighted term frequency}
+        self._doc_tokens = {}   # restaurant_id -> set of tokens (needed to remove a document)
+        self._vocab = []        # sorted list of every token in the index
+        self._versions = {}     # restaurant_id -> Restaurant.version that was indexed
+        self._watermark = datetime(1970, 1, 1) # Newest Restaurant.updated_at seen so far
+        self.refresh_interval = refresh_interval
+        self._refreshing = threading.Lock()
+
+    def setup(self):
+        from flask import current_app
+
+        self.rebuild()
+        # Catch up with other processes in the background: no search request ever waits for it
+        thread = threading.Thread(target=self._refresh_loop, args=(current_app._get_current_object(),),
+                                  name="search-refresh", daemon=True)
+        thread.start()
+
+    def _refresh_loop(self, app):
+        while True:
+            time.sleep(self.refresh_interval)
+            with app.app_context():
+                try:
+                    self.refresh()
+                except Exception:
+                    app.logger.exception("Search index refresh failed")
+                finally:
+                    db.session.remove()
+
+    def _add(self, doc):
+        weights = {}
+        for field, value in (("name", doc.name), ("description", doc.description), ("menu", doc.menu)):
+            for token in tokenize(value):
+                weights[token] = weights.get(token, 0.0) + FIELD_WEIGHTS[field]
+
+        for token, weight in weights.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                insort(self._vocab, token)
+            postings[doc.id] = weight
+        self._doc_tokens[doc.id] = set(weights)
+        self._versions[doc.id] = doc.version
+
+    def _remove(self, restaurant_id):
+        self._versions.pop(restaurant_id, None)
+        for token in self._doc_tokens.pop(restaurant_id, ()):
+            postings = self._postings[token]
+            postings.pop(restaurant_id, None)
+            if not postings:
+                del self._postings[token]
+                del self._vocab[bisect_left(self._vocab, token)]
+
+    def reindex(self, restaurant_ids):
+        documents = list(_documents(restaurant_ids))
+        with self._lock:
+            for restaurant_id in restaurant_ids:
+                self._remove(restaurant_id)
+            for doc in documents:
+                self._add(doc)
+
+    def rebuild(self):
+        # Read the watermark BEFORE the documents: a write made while they load is seen again later
+        watermark = db.session.scalar(db.select(db.func.max(Restaurant.updated_at)))
+        documents = _documents()
+        with self._lock:
+            self._postings, self._doc_tokens, self._vocab, self._versions = {}, {}, [], {}
+            for doc in documents:
+                self._add(doc)
+            if watermark is not None:
+                self._watermark = watermark
+
+    def refresh(self):
+        """
+        Catch up with writes made elsewhere (other workers, the CLI). Every catalog write moves
+        Restaurant.updated_at (and bumps Restaurant.version), so only the rows changed since the
+        watermark are read, using the index on updated_at, and only those whose version differs
+        from the indexed one are reindexed. The cost follows the write rate, not the catalog size.
+        (Restaurants are never deleted, so there is nothing to remove.)
+        """
+        if not self._refreshing.acquire(blocking=False):
+            return # Already running
+        try:
+            rows = db.session.execute(
+                db.select(Restaurant.id, Restaurant.version, Restaurant.updated_at)
+                .where(Restaurant.updated_at >= self._watermark - WATERMARK_OVERLAP)
+            ).all()
+            with self._lock:
+                changed = [row.id for row in rows if self._versions.get(row.id) != row.version]
+            for start in range(0, len(changed), 500):
+                self.reindex(changed[start:start + 500])
+            newest = max((row.updated_at for row in rows), default=None)
+            if newest is not None and newest > self._watermark:
+                self._watermark = newest
+        finally:
+            self._refreshing.release()
+
+    def _prefix_matches(self, prefix):
+        # Binary search to the first token >= prefix, then walk forward while it still matches
+        index = bisect_left(self._vocab, prefix)
+        while index < len(self._vocab) and self._vocab[index].startswith(prefix):
+            yield self._vocab[index]
+            index += 1
+
+    def search(self, tokens, limit):
+        with self._lock:
+            total_docs = len(self._doc_tokens) or 1
+            scores = None
+            for prefix in tokens:
+                # Score of this query word = best weighted match among the tokens it prefixes
+                term_scores = {}
+                for token in self._prefix_matches(prefix):
+                    postings = self._postings[token]
+                    idf = math.log(1 + total_docs / len(postings))
+                    for restaurant_id, weight in postings.items():
+                        score = weight * idf
+                        if score > term_scores.get(restaurant_id, 0.0):
+                            term_scores[restaurant_id] = score
+
+                # Every query word has to match (AND), so keep only the overlap
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {rid: scores[rid] + s for rid, s in term_scores.items() if rid in scores}
+                if not scores:
+                    return []
+
+        ranked = sorted(scores.items(), key=lambda pair: (-pair[1], pair[0]))
+        return [restaurant_id for restaurant_id, _ in ranked[:limit]]
+
+
+class SearchIndex:
+    """Picks a backend for the app and hides which one is in use from the routes."""
+
+    def init_app(self, app):
+        app.extensions["search"] = {"backend": None, "lock": threading.Lock()}
+
+    def _backend(self):
+        from flask import current_app
+
+        state = current_app.extensions["search"]
+        if state["backend"] is None:
+            with state["lock"]:
+                if state["backend"] is None:
+                    state["backend"] = self._create_backend(current_app.config.get("SEARCH_BACKEND", "auto"))
+        return state["backend"]
+
+    def _choose_backend(self, choice):
+        # Only looks at the config and the database: nothing is loaded or started here
+        if choice in ("auto", "fts5") and db.engine.dialect.name == "sqlite":
+            if choice == "fts5" or SqliteFtsBackend.available():
+                return "fts5" # Asked for explicitly: its setup() says what is missing
+        # No FTS table (e.g. this SQLite build has no FTS5) or not SQLite -> the in-process index
+        return "memory"
+
+    def _create_backend(self, choice):
+        from flask import current_app
+
+        if self._choose_backend(choice) == "fts5":
+            backend = SqliteFtsBackend()
+        else:
+            backend = InMemoryBackend(current_app.config.get("SEARCH_REFRESH_INTERVAL", 5))
+        backend.setup()
+        return backend
+
+    def search(self, query, limit):
+        # Returns restaurant IDs, best match first
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        return self._backend().search(tokens, limit)
+
+    def reindex(self, *restaurant_ids):
+        # Call after a commit that changed a restaurant or its menu
+        if restaurant_ids:
+            self._backend().reindex(list(restaurant_ids))
+
+    def rebuild(self):
+        self._backend().rebuild()
+
+    @property
+    def backend_name(self):
+        # Decided without building the backend: an in-memory index would load every restaurant
+        # and start a refresh thread, which a one-off CLI command has no use for
+        from flask import current_app
+
+        state = current_app.extensions["search"]
+        if state["backend"] is not None:
+            return state["backend"].name
+        return self._choose_backend(current_app.config.get("SEARCH_BACKEND", "auto"))
+
+
+search_index = SearchIndex()
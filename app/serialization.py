@@ -0,0 +1,104 @@
+"""
+JSON output for the whole app.
+
+1. The JSON provider: when `orjson` is installed (see requirements.txt), every
+   jsonify() goes through it. orjson is a C encoder that writes bytes directly and
+   handles datetime natively; Decimal prices are turned into strings ("9.99").
+   Without orjson we fall back to Flask's encoder with the same output format.
+
+2. The serializers: one function per model that builds the response dict.
+   They only read attributes, so they work on ORM objects AND on plain result
+   rows from column-only queries (db.select(Model.id, Model.name, ...)).
+   Prices stay Decimal and dates stay datetime; the provider converts them.
+"""
+
+# app/serialization.py
+import time
+from datetime import date
+from decimal import Decimal
+
+from flask.json.provider import JSONProvider
+
+from app.instrumentation import InstrumentedJSONProvider, record_serialization
+
+try:
+    import orjson
+except ImportError:  # Optional: the stdlib encoder below is used instead
+    orjson = None
+
+
+def _default(obj):
+    # Types the encoder doesn't know by itself
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, date):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class OrjsonProvider(JSONProvider):
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs):
+        return self._dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def _dumps_bytes(self, obj):
+        started = time.perf_counter()
+        try:
+            return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        finally:
+            record_serialization(time.perf_counter() - started)
+
+    def response(self, *args, **kwargs):
+        # Skip the bytes -> str -> bytes round trip that dumps() would need
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
+
+
+class StdlibJSONProvider(InstrumentedJSONProvider):
+    # Same output as OrjsonProvider (ISO dates, string prices), just slower
+    default = staticmethod(_default)
+    sort_keys = False
+
+
+def init_json(app):
+    use_orjson = orjson is not None and app.config.get("JSON_USE_ORJSON", True)
+    app.json = OrjsonProvider(app) if use_orjson else StdlibJSONProvider(app)
+
+
+# --- SERIALIZERS ---
+
+def menu_item_dict(item):
+    return {"id": item.id, "name": item.name, "price": item.price}
+
+
+def restaurant_dict(restaurant, menu_items):
+    return {
+        "id": restaurant.id,
+        "name": restaurant.name,
+        "description": restaurant.description,
+        "address": restaurant.address,
+        "image_url": restaurant.image_url,
+        "menu_items": menu_items
+    }
+
+
+def order_item_dict(item):
+    return {"name": item.item_name, "quantity": item.quantity, "price": item.price_at_order}
+
+
+def order_dict(order, items=None):
+    data = {
+        "id": order.id,
+        "restaurant_id": order.restaurant_id,
+        "status": order.status,
+        "version": order.version,
+        "total_price": order.total_price,
+        "date": order.created_at
+    }
+    if items is not None:
+        data["items"] = items
+    return data
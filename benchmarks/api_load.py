@@ -0,0 +1,403 @@
+"""
+Load test for the whole API.
+
+1. Seeds a (large) dataset into a database file: restaurants built from seed.py's
+   RESTAURANTS_DATA, their menu items, users and orders, all with bulk INSERTs.
+   A database that is already seeded is reused (pass --reseed to start over).
+2. Drives the real create_app() app with N concurrent clients, either in-process
+   (Flask test client, also counts SQL queries per request) or over HTTP against
+   a local gunicorn that the script starts itself.
+3. Prints (and optionally writes) JSON with p50/p90/p99 latency, throughput,
+   errors and queries per request for every endpoint. --compare shows the
+   change against an earlier result file.
+
+Small run:      python benchmarks/api_load.py
+Full catalog:   python benchmarks/api_load.py --restaurants 50000 --items-per-restaurant 10 \\
+                    --users 50000 --orders 5000000 --database /tmp/zomighty-bench.db
+Over gunicorn:  python benchmarks/api_load.py --server gunicorn --workers 4
+"""
+
+# benchmarks/api_load.py
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import event  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.migrations import upgrade  # noqa: E402
+from app.models import User, Restaurant, MenuItem, Order, OrderItem  # noqa: E402
+from seed import RESTAURANTS_DATA  # noqa: E402
+
+PASSWORD = "bench-password"
+BATCH = 10000
+
+
+# --- 1. SEEDING ---
+
+def _insert_batches(table, rows):
+    # executemany in chunks so memory stays flat even for millions of rows
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH:
+            db.session.execute(db.insert(table), batch)
+            batch = []
+    if batch:
+        db.session.execute(db.insert(table), batch)
+    db.session.commit()
+
+
+def seed_dataset(args):
+    if db.session.execute(db.select(Restaurant.id).limit(1)).first() is not None:
+        print("Database already seeded, reusing it", file=sys.stderr)
+        return
+
+    started = time.perf_counter()
+    rng = random.Random(42)
+    items_per = args.items_per_restaurant
+
+    def restaurants():
+        for rid in range(1, args.restaurants + 1):
+            name, desc, address, img = RESTAURANTS_DATA[rid % len(RESTAURANTS_DATA)]
+            yield {"id": rid, "name": f"{name} #{rid}", "description": desc, "address": address,
+                   "image_url": img, "version": 1, "updated_at": datetime.utcnow()}
+
+    # Menu item IDs are preassigned: restaurant r owns items (r-1)*items_per+1 .. r*items_per
+    def menu_items():
+        for rid in range(1, args.restaurants + 1):
+            name = RESTAURANTS_DATA[rid % len(RESTAURANTS_DATA)][0]
+            for i in range(items_per):
+                yield {"id": (rid - 1) * items_per + i + 1, "restaurant_id": rid,
+                       "name": f"{name.split()[0]} special {i}", "price": round(rng.uniform(2.99, 15.99), 2),
+                       "is_active": True, "updated_at": datetime.utcnow()}
+
+    # Hashing is slow on purpose, so every benchmark user shares one hash
+    password_hash = _hash_once()
+
+    def users():
+        for uid in range(1, args.users + 1):
+            yield {"id": uid, "username": f"user{uid}", "email": f"user{uid}@bench.local",
+                   "password_hash": password_hash, "created_at": datetime.utcnow()}
+
+    now = datetime.utcnow()
+
+    def orders_and_items():
+        order_rows, item_rows = [], []
+        item_id = 1
+        for oid in range(1, args.orders + 1):
+            rid = rng.randint(1, args.restaurants)
+            lines = [((rid - 1) * items_per + rng.randint(1, items_per), rng.randint(1, 3)) for _ in range(2)]
+            total = 0
+            for menu_item_id, qty in lines:
+                item_rows.append({"id": item_id, "order_id": oid, "menu_item_id": menu_item_id,
+                                  "price_at_order": 9.99, "quantity": qty, "item_name": "bench item"})
+                item_id += 1
+                total += 9.99 * qty
+            order_rows.append({"id": oid, "user_id": rng.randint(1, args.users), "restaurant_id": rid,
+                               "status": rng.choice(["pending", "preparing", "delivered", "cancelled"]),
+                               "total_price": round(total, 2),
+                               "created_at": now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))})
+            if len(order_rows) >= BATCH:
+                yield order_rows, item_rows
+                order_rows, item_rows = [], []
+        if order_rows:
+            yield order_rows, item_rows
+
+    _insert_batches(Restaurant, restaurants())
+    _insert_batches(MenuItem, menu_items())
+    _insert_batches(User, users())
+    for order_rows, item_rows in orders_and_items():
+        db.session.execute(db.insert(Order), order_rows)
+        db.session.execute(db.insert(OrderItem), item_rows)
+    db.session.commit()
+
+    print(f"Seeded in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+def _hash_once():
+    from app.hashing import password_hasher
+    return password_hasher.hash(PASSWORD)
+
+
+# --- 2. CLIENTS ---
+
+class InProcessClient:
+    """Calls the app directly through the Flask test client (no network)."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None, token=None):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        response = self.client.open(path, method=method, json=body, headers=headers)
+        return response.status_code
+
+
+class HttpClient:
+    """One keep-alive HTTP connection per benchmark thread."""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.conn = http.client.HTTPConnection(host, port, timeout=30)
+
+    def request(self, method, path, body=None, token=None):
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        payload = json.dumps(body) if body is not None else None
+        try:
+            self.conn.request(method, path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+            response.read()
+            return response.status
+        except (http.client.HTTPException, OSError):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            return 599
+
+
+# --- 3. SCENARIOS ---
+
+def build_scenarios(args, tokens):
+    items_per = args.items_per_restaurant
+
+    def restaurant_list(rng):
+        return "GET", f"/api/restaurants/?page={rng.randint(1, max(1, args.restaurants // 12))}", None, None
+
+    def restaurant_detail(rng):
+        return "GET", f"/api/restaurants/{rng.randint(1, args.restaurants)}", None, None
+
+    def orders_list(rng):
+        return "GET", "/api/orders/", None, rng.choice(tokens)
+
+    def orders_create(rng):
+        rid = rng.randint(1, args.restaurants)
+        items = [{"menu_item_id": (rid - 1) * items_per + rng.randint(1, items_per), "quantity": 1} for _ in range(3)]
+        return "POST", "/api/orders/", {"restaurant_id": rid, "items": items}, rng.choice(tokens)
+
+    def login(rng):
+        uid = rng.randint(1, args.users)
+        return "POST", "/api/auth/login", {"email": f"user{uid}@bench.local", "password": PASSWORD}, None
+
+    return {
+        "GET /api/restaurants/": restaurant_list,
+        "GET /api/restaurants/<id>": restaurant_detail,
+        "GET /api/orders/": orders_list,
+        "POST /api/orders/": orders_create,
+        "POST /api/auth/login": login,
+    }
+
+
+class QueryCounter:
+    """Counts SQL statements per thread (in-process mode only)."""
+
+    def __init__(self, engine):
+        self.local = threading.local()
+        event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *_args):
+        self.local.count = getattr(self.local, "count", 0) + 1
+
+    def reset(self):
+        self.local.count = 0
+
+    def value(self):
+        return getattr(self.local, "count", 0)
+
+
+def run_endpoint(name, scenario, make_client, args, counter):
+    latencies, statuses, queries = [], [], []
+    lock = threading.Lock()
+    per_thread = max(1, args.requests // args.concurrency)
+
+    def worker(seed):
+        rng = random.Random(seed)
+        client = make_client()
+        mine_lat, mine_status, mine_queries = [], [], []
+        for _ in range(per_thread):
+            method, path, body, token = scenario(rng)
+            if counter:
+                counter.reset()
+            started = time.perf_counter()
+            status = client.request(method, path, body, token)
+            mine_lat.append(time.perf_counter() - started)
+            mine_status.append(status)
+            if counter:
+                mine_queries.append(counter.value())
+        with lock:
+            latencies.extend(mine_lat)
+            statuses.extend(mine_status)
+            queries.extend(mine_queries)
+
+    threads = [threading.Thread(target=worker, args=(hash(name) + i,)) for i in range(args.concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    # Requests turned away (429 rate limited, 503 shed) are answered in microseconds
+    # without doing the work: counted, but kept out of the latency figures
+    rejected = (429, 503)
+    served = sorted(latency for latency, status in zip(latencies, statuses) if status not in rejected)
+
+    def pct(p):
+        if not served:
+            return None
+        return round(served[min(len(served) - 1, int(len(served) * p))] * 1000, 3)
+
+    result = {
+        "requests": len(latencies),
+        "errors": sum(1 for status in statuses if status >= 400 and status not in rejected),
+        "throttled": sum(1 for status in statuses if status in rejected),
+        "throughput_rps": round(len(served) / elapsed, 1),
+        "p50_ms": pct(0.50),
+        "p90_ms": pct(0.90),
+        "p99_ms": pct(0.99),
+        "mean_ms": round(statistics.fmean(served) * 1000, 3) if served else None,
+    }
+    if queries:
+        result["queries_per_request"] = round(statistics.fmean(queries), 2)
+    return result
+
+
+# --- 4. SERVER MODE ---
+
+# The same as BenchConfig, for the gunicorn workers (they read their config from the environment)
+BENCH_ENV = {"RATELIMIT_ENABLED": "false", "LOAD_SHED_MAX_IN_FLIGHT": "0"}
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(database_url, workers):
+    port = _free_port()
+    env = dict(os.environ, DATABASE_URL=database_url, **BENCH_ENV)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-w", str(workers), "-b", f"127.0.0.1:{port}", "run:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return process, port
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("gunicorn did not start")
+
+
+# --- MAIN ---
+
+def compare(current, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)["endpoints"]
+    changes = {}
+    for name, result in current.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        changes[name] = {
+            key: f"{(result[key] - before[key]) / before[key] * 100:+.1f}%"
+            for key in ("p50_ms", "p99_ms", "throughput_rps") if before.get(key) and result.get(key) is not None
+        }
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", default=os.path.join(tempfile.gettempdir(), "zomighty-bench.db"))
+    parser.add_argument("--reseed", action="store_true", help="delete the database file and seed again")
+    parser.add_argument("--restaurants", type=int, default=2000)
+    parser.add_argument("--items-per-restaurant", type=int, default=10)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--server", choices=["inprocess", "gunicorn"], default="inprocess")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn workers (server mode)")
+    parser.add_argument("--endpoints", help="comma separated subset, e.g. 'GET /api/orders/'")
+    parser.add_argument("--output", help="write the JSON results here")
+    parser.add_argument("--compare", help="earlier --output file to compare against")
+    args = parser.parse_args()
+
+    if args.reseed and os.path.exists(args.database):
+        os.remove(args.database)
+    database_url = f"sqlite:///{args.database}"
+
+    config = type("BenchConfig", (Config,), {
+        "SQLALCHEMY_DATABASE_URI": database_url,
+        "RATELIMIT_ENABLED": False,  # 200 users logging in again and again: measure the endpoints,
+        "LOAD_SHED_MAX_IN_FLIGHT": 0,  # not the 429s and 503s that protect them
+    })
+    app = create_app(config)
+    with app.app_context():
+        upgrade(db.engine, log=lambda message: print(message, file=sys.stderr))
+        seed_dataset(args)
+        from flask_jwt_extended import create_access_token
+        tokens = [create_access_token(identity=str(uid)) for uid in range(1, min(args.users, 200) + 1)]
+
+    scenarios = build_scenarios(args, tokens)
+    if args.endpoints:
+        wanted = {name.strip() for name in args.endpoints.split(",")}
+        scenarios = {name: scenario for name, scenario in scenarios.items() if name in wanted}
+
+    server = None
+    if args.server == "gunicorn":
+        server, port = start_gunicorn(database_url, args.workers)
+        make_client, counter = (lambda: HttpClient("127.0.0.1", port)), None
+    else:
+        with app.app_context():
+            counter = QueryCounter(db.engine)
+        make_client = lambda: InProcessClient(app)  # noqa: E731
+
+    try:
+        endpoints = {}
+        for name, scenario in scenarios.items():
+            endpoints[name] = run_endpoint(name, scenario, make_client, args, counter)
+            print(f"{name}: {endpoints[name]}", file=sys.stderr)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    results = {
+        "benchmark": "api_load",
+        "timestamp": datetime.utcnow().isoformat(),
+        "server": args.server,
+        "concurrency": args.concurrency,
+        "dataset": {"restaurants": args.restaurants, "items_per_restaurant": args.items_per_restaurant,
+                    "users": args.users, "orders": args.orders},
+        "endpoints": endpoints,
+    }
+    if args.compare:
+        results["compared_to"] = {"file": args.compare, "changes": compare(endpoints, args.compare)}
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
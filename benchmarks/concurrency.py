@@ -0,0 +1,135 @@
+"""
+Sync vs gevent workers at high connection counts.
+
+Starts a real gunicorn (with gunicorn.conf.py) once per worker class and drives the read-heavy
+endpoints with more and more concurrent keep-alive connections, printing requests per second
+and latency percentiles for each (worker class, connections) pair as JSON.
+
+The local SQLite database answers in microseconds, which hides exactly what gevent is for:
+waiting on a database across the network. --db-latency-ms adds that wait to every SQL
+statement (a sleep in a before_cursor_execute listener; gevent turns it into a switch to
+another greenlet, like a real socket read from MySQL with PyMySQL).
+
+    python benchmarks/concurrency.py
+    python benchmarks/concurrency.py --connections 10,50,200,500 --db-latency-ms 20 --workers 2
+"""
+
+# benchmarks/concurrency.py
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from api_load import BENCH_ENV, HttpClient, build_scenarios, run_endpoint, seed_dataset, _free_port  # noqa: E402
+
+# gunicorn config used by the benchmark: the real one, plus the simulated database latency
+CONFIG_TEMPLATE = """
+exec(open({real_config!r}).read())
+
+def post_worker_init(worker):
+    import time
+    from sqlalchemy import event
+    from app.extensions import db
+
+    flask_app = worker.app.wsgi()
+    with flask_app.app_context():
+        event.listen(db.engine, "before_cursor_execute", lambda *args: time.sleep({latency!r}))
+"""
+
+ENDPOINTS = ("GET /api/restaurants/", "GET /api/restaurants/<id>", "GET /api/orders/")
+
+
+def start_server(database_url, worker_class, workers, latency, tmp):
+    import subprocess
+    import socket
+
+    config_path = os.path.join(tmp, f"gunicorn-{worker_class}.conf.py")
+    with open(config_path, "w") as f:
+        f.write(CONFIG_TEMPLATE.format(real_config=os.path.join(ROOT, "gunicorn.conf.py"), latency=latency))
+
+    port = _free_port()
+    env = dict(os.environ, DATABASE_URL=database_url, GUNICORN_WORKER_CLASS=worker_class,
+               WEB_CONCURRENCY=str(workers), INSTRUMENTATION_ENABLED="false",
+               CACHE_BACKEND="none",  # Every request reaches the database
+               **BENCH_ENV)           # Measure the worker model, not the rate limiter or the shedder
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", config_path, "-b", f"127.0.0.1:{port}", "run:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return process, port
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"gunicorn ({worker_class}) did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", default=os.path.join(tempfile.gettempdir(), "zomighty-bench.db"))
+    parser.add_argument("--restaurants", type=int, default=2000)
+    parser.add_argument("--items-per-restaurant", type=int, default=10)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--worker-classes", default="sync,gevent")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers (the same for every class)")
+    parser.add_argument("--connections", default="10,50,200", help="comma separated concurrent connection counts")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per endpoint and connection count")
+    parser.add_argument("--db-latency-ms", type=float, default=10.0, help="simulated network time per SQL statement")
+    parser.add_argument("--output", help="write the JSON results here")
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.config import Config
+    from app.extensions import db
+    from app.migrations import upgrade
+
+    database_url = f"sqlite:///{args.database}"
+    app = create_app(type("BenchConfig", (Config,), {"SQLALCHEMY_DATABASE_URI": database_url, "RATELIMIT_ENABLED": False}))
+    with app.app_context():
+        upgrade(db.engine, log=lambda message: print(message, file=sys.stderr))
+        seed_dataset(args)
+        from flask_jwt_extended import create_access_token
+        tokens = [create_access_token(identity=str(uid)) for uid in range(1, min(args.users, 200) + 1)]
+    scenarios = {name: scenario for name, scenario in build_scenarios(args, tokens).items() if name in ENDPOINTS}
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for worker_class in args.worker_classes.split(","):
+            server, port = start_server(database_url, worker_class, args.workers, args.db_latency_ms / 1000, tmp)
+            try:
+                for connections in [int(c) for c in args.connections.split(",")]:
+                    run_args = argparse.Namespace(requests=args.requests, concurrency=connections)
+                    for name, scenario in scenarios.items():
+                        result = run_endpoint(name, scenario, lambda: HttpClient("127.0.0.1", port), run_args, None)
+                        results.setdefault(worker_class, {}).setdefault(str(connections), {})[name] = result
+                        print(f"{worker_class} x{connections} {name}: {result['throughput_rps']} rps, "
+                              f"p99 {result['p99_ms']} ms, errors {result['errors']}", file=sys.stderr)
+            finally:
+                server.terminate()
+                server.wait()
+
+    text = json.dumps({
+        "benchmark": "concurrency",
+        "timestamp": datetime.utcnow().isoformat(),
+        "workers": args.workers,
+        "db_latency_ms": args.db_latency_ms,
+        "results": results,
+    }, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
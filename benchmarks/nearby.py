@@ -0,0 +1,132 @@
+"""
+"Restaurants near me" benchmark: the geohash index (app/geo.py) against a brute-force scan.
+
+Seeds --restaurants restaurants at random points in a city-sized region into a migrated
+SQLite file, then for --queries random points measures:
+- indexed:     geo.find_within() (geohash cell range scans + exact distance),
+- brute_force: load every restaurant's coordinates and compute every distance,
+and checks both return the same restaurants. p50 / p95 in milliseconds are printed as JSON.
+
+    python benchmarks/nearby.py --restaurants 100000 --radius-km 3
+"""
+
+# benchmarks/nearby.py
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+# Roughly the New York City area
+REGION = (40.45, -74.30, 40.95, -73.65)
+
+
+def random_point(rng):
+    min_lat, min_lng, max_lat, max_lng = REGION
+    return rng.uniform(min_lat, max_lat), rng.uniform(min_lng, max_lng)
+
+
+def seed(count, rng):
+    from app import geo
+    from app.extensions import db
+    from app.models import Restaurant
+
+    rows = []
+    for rid in range(1, count + 1):
+        latitude, longitude = random_point(rng)
+        rows.append({"id": rid, "name": f"Restaurant {rid}", "address": "1 Main St",
+                     "latitude": latitude, "longitude": longitude, "geohash": geo.encode(latitude, longitude)})
+    for start in range(0, count, 10000):
+        db.session.execute(db.insert(Restaurant), rows[start:start + 10000])
+    db.session.commit()
+
+
+def brute_force(latitude, longitude, radius_km):
+    from app import geo
+    from app.extensions import db
+    from app.models import Restaurant
+
+    rows = db.session.execute(db.select(Restaurant.id, Restaurant.latitude, Restaurant.longitude))
+    found = []
+    for row in rows:
+        distance = geo.haversine_km(latitude, longitude, row.latitude, row.longitude)
+        if distance <= radius_km:
+            found.append((distance, row))
+    found.sort(key=lambda pair: pair[0])
+    return found
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return (time.perf_counter() - started) * 1000, result
+
+
+def summary(timings):
+    timings = sorted(timings)
+    return {"p50": round(statistics.median(timings), 3),
+            "p95": round(timings[int(len(timings) * 0.95) - 1], 3),
+            "max": round(timings[-1], 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--restaurants", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--radius-km", type=float, default=3.0)
+    parser.add_argument("--brute-force-queries", type=int, default=20, help="the slow path is measured fewer times")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON results here")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'nearby.db')}"
+        os.environ.setdefault("INSTRUMENTATION_ENABLED", "false")
+        from app import create_app, geo
+        from app.extensions import db
+        from app.migrations import upgrade
+
+        app = create_app()
+        with app.app_context():
+            upgrade(db.engine, log=lambda message: None)
+            seed(args.restaurants, rng)
+
+            points = [random_point(rng) for _ in range(args.queries)]
+            indexed, brute, matches = [], [], []
+            for number, (latitude, longitude) in enumerate(points):
+                elapsed, found = timed(geo.find_within, latitude, longitude, args.radius_km)
+                indexed.append(elapsed)
+                matches.append(len(found))
+                if number < args.brute_force_queries:
+                    elapsed, expected = timed(brute_force, latitude, longitude, args.radius_km)
+                    brute.append(elapsed)
+                    assert [row.id for _d, row in found] == [row.id for _d, row in expected], "results differ"
+
+            nearest = [timed(geo.find_nearest, latitude, longitude, 20, 50)[0]
+                       for latitude, longitude in points]
+
+    results = {
+        "unit": "ms",
+        "restaurants": args.restaurants,
+        "radius_km": args.radius_km,
+        "matches_per_query": round(statistics.mean(matches), 1),
+        "indexed_radius": summary(indexed),
+        "indexed_nearest_20": summary(nearest),
+        "brute_force_radius": summary(brute),
+    }
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
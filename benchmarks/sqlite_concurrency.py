@@ -0,0 +1,127 @@
+"""
+Concurrent read/write throughput on SQLite: default rollback journal vs. the WAL settings
+that app/database.py applies.
+
+A few reader threads run the restaurant listing's menu query in a loop while one writer
+thread keeps inserting orders (like place_order does). Both setups run against a fresh
+database file with the same data, and the results are printed as JSON.
+
+    python benchmarks/sqlite_concurrency.py --seconds 5 --readers 4
+"""
+
+# benchmarks/sqlite_concurrency.py
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from app.database import sqlite_pragma_listener  # noqa: E402
+
+
+SCHEMA = [
+    "CREATE TABLE menu_items (id INTEGER PRIMARY KEY, restaurant_id INTEGER, name TEXT, price NUMERIC)",
+    "CREATE INDEX ix_menu_items_restaurant_id ON menu_items (restaurant_id)",
+    "CREATE TABLE orders (id INTEGER PRIMARY KEY, user_id INTEGER, restaurant_id INTEGER, total_price NUMERIC)",
+]
+
+
+def make_engine(path, wal):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 5})
+    if wal:
+        event.listen(engine, "connect", sqlite_pragma_listener(mmap_size=256 * 1024 * 1024))
+    else:
+        # SQLite's defaults: rollback journal, synchronous=FULL
+        event.listen(engine, "connect", sqlite_pragma_listener("DELETE", "FULL", 5000, 0))
+    return engine
+
+
+def seed(engine, restaurants):
+    with engine.begin() as conn:
+        for statement in SCHEMA:
+            conn.execute(text(statement))
+        conn.execute(
+            text("INSERT INTO menu_items (restaurant_id, name, price) VALUES (:r, :n, :p)"),
+            [{"r": r, "n": f"item {r}-{i}", "p": 9.99} for r in range(restaurants) for i in range(5)],
+        )
+
+
+def run(wal, seconds, readers, restaurants):
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "bench.db")
+    engine = make_engine(path, wal)
+    seed(engine, restaurants)
+
+    stop = threading.Event()
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def reader(offset):
+        done = errors = 0
+        page = offset
+        while not stop.is_set():
+            ids = [(page * 12 + i) % restaurants for i in range(12)]
+            try:
+                with engine.connect() as conn:
+                    conn.execute(
+                        text(f"SELECT id, name, price, restaurant_id FROM menu_items "
+                             f"WHERE restaurant_id IN ({','.join(map(str, ids))})")
+                    ).all()
+                done += 1
+            except OperationalError:
+                errors += 1
+            page += 1
+        with lock:
+            counts["reads"] += done
+            counts["errors"] += errors
+
+    def writer():
+        done = errors = 0
+        while not stop.is_set():
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text("INSERT INTO orders (user_id, restaurant_id, total_price) VALUES (1, 1, 19.98)"))
+                done += 1
+            except OperationalError:
+                errors += 1
+        with lock:
+            counts["writes"] += done
+            counts["errors"] += errors
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads.append(threading.Thread(target=writer))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    return {
+        "mode": "wal" if wal else "rollback-journal",
+        "reads_per_sec": round(counts["reads"] / seconds, 1),
+        "writes_per_sec": round(counts["writes"] / seconds, 1),
+        "errors": counts["errors"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--restaurants", type=int, default=2000)
+    args = parser.parse_args()
+
+    results = [run(wal, args.seconds, args.readers, args.restaurants) for wal in (False, True)]
+    print(json.dumps({"benchmark": "sqlite_concurrency", "readers": args.readers, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Startup benchmark: how long until a fresh process can serve its first request.
+
+For every run a NEW Python process measures:
+- import:        `from app import create_app` (all modules, Flask, SQLAlchemy, ...),
+- create_app:    building the app (extensions, blueprints, engine),
+- create_all:    what the old run.py did on every boot (only with --with-create-all),
+- first_request: GET /api/restaurants/ (first database connection, SQLite pragmas, ...),
+- second_request: the same again, for comparison.
+The median over --runs processes is printed as JSON.
+
+--gunicorn also starts a real gunicorn with and without preload_app and measures the time
+from launch until the first HTTP response.
+
+    python benchmarks/startup.py --runs 10
+    python benchmarks/startup.py --with-create-all --gunicorn --workers 4
+"""
+
+# benchmarks/startup.py
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Runs inside the fresh process; prints one JSON line with the timings in seconds
+CHILD = r"""
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+from app.extensions import db
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+timings = {"import": imported - started, "create_app": created - imported}
+if "--with-create-all" in sys.argv:
+    with app.app_context():
+        db.create_all()
+    timings["create_all"] = time.perf_counter() - created
+client = app.test_client()
+for name in ("first_request", "second_request"):
+    begin = time.perf_counter()
+    response = client.get("/api/restaurants/?per_page=12")
+    assert response.status_code == 200, response.status_code
+    timings[name] = time.perf_counter() - begin
+timings["total"] = time.perf_counter() - started
+print(json.dumps(timings))
+"""
+
+
+def prepare_database(path):
+    # A migrated database with a few restaurants, built once for all runs
+    sys.path.insert(0, ROOT)
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    from app import create_app
+    from app.extensions import db
+    from app.migrations import upgrade
+    from app.models import Restaurant, MenuItem
+
+    app = create_app()
+    with app.app_context():
+        upgrade(db.engine, log=lambda message: None)
+        for rid in range(1, 51):
+            db.session.add(Restaurant(id=rid, name=f"Restaurant {rid}", address="1 Main St"))
+            db.session.add(MenuItem(name="Dish", price=9.99, restaurant_id=rid))
+        db.session.commit()
+
+
+def measure_process(database, with_create_all):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{database}", INSTRUMENTATION_ENABLED="false")
+    argv = [sys.executable, "-c", CHILD] + (["--with-create-all"] if with_create_all else [])
+    output = subprocess.run(argv, cwd=ROOT, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_gunicorn(database, workers, preload):
+    # Seconds from launching gunicorn until the first 200, and until `workers` requests succeeded
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{database}", PORT=str(port),
+               WEB_CONCURRENCY=str(workers), GUNICORN_PRELOAD="true" if preload else "false")
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "-b", f"127.0.0.1:{port}", "run:app"],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    first = None
+    ok = 0
+    try:
+        while ok < workers and time.perf_counter() - started < 60:
+            try:
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+                connection.request("GET", "/api/restaurants/?per_page=12")
+                if connection.getresponse().status == 200:
+                    ok += 1
+                    first = first or time.perf_counter() - started
+                connection.close()
+            except OSError:
+                time.sleep(0.01)
+        return {"first_response": first, "workers_answered": time.perf_counter() - started}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def median_of(runs):
+    return {key: round(statistics.median(run[key] for run in runs) * 1000, 2) for key in runs[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes to measure")
+    parser.add_argument("--with-create-all", action="store_true", help="also time the old create_all() on boot")
+    parser.add_argument("--gunicorn", action="store_true", help="also time a real gunicorn boot, with and without preload")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--output", help="write the JSON results here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, "startup.db")
+        prepare_database(database)
+
+        results = {"unit": "ms", "runs": args.runs}
+        results["process"] = median_of([measure_process(database, False) for _ in range(args.runs)])
+        if args.with_create_all:
+            results["process_with_create_all"] = median_of(
+                [measure_process(database, True) for _ in range(args.runs)])
+        if args.gunicorn:
+            for preload in (False, True):
+                runs = [measure_gunicorn(database, args.workers, preload) for _ in range(args.runs)]
+                results[f"gunicorn_preload_{'on' if preload else 'off'}"] = median_of(runs)
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Gunicorn settings, used by the Procfile:  gunicorn -c gunicorn.conf.py run:app
+
+preload_app: the app (all imports, create_app, the blueprints) is loaded ONCE in the
+master process, and the workers are forked from it. Workers then start almost instantly
+and share the loaded code in memory (copy-on-write), instead of each one importing
+everything again. The master never talks to the database (create_app opens no
+connections), and post_fork() below makes sure every worker gets its own connection pool.
+
+worker_class: 'sync' (default) handles ONE request per worker at a time, so a worker waiting
+on MySQL does nothing else. GUNICORN_WORKER_CLASS=gevent runs every request in a greenlet:
+while one waits on the network (database, Redis, a long-poll), the worker serves others, up to
+GUNICORN_WORKER_CONNECTIONS at once. The app code stays the same, but:
+- install gevent (pip install gevent),
+- use a pure-Python database driver, e.g. mysql+pymysql://. C drivers (mysqlclient) and
+  SQLite block the whole worker while a query runs,
+- DB_POOL_SIZE + DB_MAX_OVERFLOW still caps the queries running at once per worker, and
+  LOAD_SHED_MAX_IN_FLIGHT caps the requests (more are refused with 503).
+Order events (long-poll and SSE) only keep requests open on gevent workers: a sync worker
+would serve nobody else meanwhile and be killed after `timeout`. On sync workers they answer
+at once and clients poll every ORDER_EVENTS_POLL_INTERVAL seconds (see app/events.py).
+See benchmarks/concurrency.py for sync vs gevent at high connection counts.
+"""
+
+# gunicorn.conf.py
+import multiprocessing
+import os
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+
+if worker_class == 'gevent':
+    # Patch sockets, locks, sleep... BEFORE the app is imported (preload_app imports it in the
+    # master), otherwise the locks and queues created at import time would block the whole worker.
+    try:
+        from gevent import monkey
+    except ImportError:
+        raise RuntimeError("GUNICORN_WORKER_CLASS=gevent needs the 'gevent' package (pip install gevent)")
+    monkey.patch_all()
+    worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000)) # Greenlets (requests) per worker
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 1)) # gthread workers only; ignored by gevent
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+
+def post_fork(server, worker):
+    # A connection must never be shared by two processes: drop whatever pool the worker
+    # inherited from the master (without closing the master's connections) so it opens its own.
+    if not preload_app:
+        return
+    from app.extensions import db
+
+    flask_app = worker.app.wsgi()
+    with flask_app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
@@ -1,15 +1,10 @@
 from app import create_app
-from app.extensions import db
 
+# The schema is NOT created here any more: every gunicorn worker imports this file, and
+# running DDL checks on each boot made restarts slow. Run the migrations once per deploy:
+#     flask --app run db upgrade
+# (see app/migrations/__init__.py)
 app = create_app()
 
-# --- ADD THIS BLOCK ---
-# This forces the app to create the tables automatically before starting
-with app.app_context():
-    db.create_all()
-    print("Database tables created successfully!")
-# ----------------------
-
 if __name__ == '__main__':
     app.run(debug=True)
-    
\ No newline at end of file
@@ -0,0 +1,63 @@
+# tests/conftest.py
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models import User
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'  # A fresh in-memory database per app
+    JWT_SECRET_KEY = 'test-secret-key-that-is-long-enough-for-hs256'
+
+
+@pytest.fixture
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    """Creates a user and returns (user_id, headers with a valid token for them)."""
+    def make_user(name='customer'):
+        user = User(username=name, email=f'{name}@example.com', password_hash='-')
+        db.session.add(user)
+        db.session.commit()
+        return user.id, {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+    return make_user
+
+
+class QueryCounter:
+    """Counts the SQL statements sent to the database while it is active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _count(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._count)
+
+
+@pytest.fixture
+def count_queries(app):
+    return lambda: QueryCounter(db.engine)
@@ -0,0 +1,48 @@
+# tests/test_cli.py
+import json
+
+from app.extensions import db
+from app.models import MenuItem, Restaurant
+
+
+def test_import_bumps_both_restaurants_when_an_item_moves(app, tmp_path):
+    db.session.add_all([Restaurant(id=1, name='Pizza', address='1 Main St'),
+                        Restaurant(id=2, name='Sushi', address='2 Main St')])
+    db.session.add(MenuItem(id=10, restaurant_id=1, name='Margherita', price=9))
+    db.session.commit()
+
+    path = tmp_path / 'menu.jsonl'
+    path.write_text(json.dumps({'id': 10, 'restaurant_id': 2, 'name': 'Margherita', 'price': '9.50'}) + '\n')
+    result = app.test_cli_runner().invoke(args=['catalog', 'import', '--menu-items', str(path)])
+
+    assert result.exit_code == 0, result.output
+    db.session.expire_all()
+    assert db.session.get(MenuItem, 10).restaurant_id == 2
+    # The menu of BOTH restaurants changed: both get a new ETag
+    assert db.session.get(Restaurant, 1).version == 2
+    assert db.session.get(Restaurant, 2).version == 2
+
+
+def test_import_rejects_prices_that_are_not_positive(app, tmp_path):
+    db.session.add(Restaurant(id=1, name='Pizza', address='1 Main St'))
+    db.session.commit()
+
+    for price in ('0', '-3', 'NaN'):
+        path = tmp_path / 'menu.jsonl'
+        path.write_text(json.dumps({'id': 10, 'restaurant_id': 1, 'name': 'Margherita', 'price': price}) + '\n')
+        result = app.test_cli_runner().invoke(args=['catalog', 'import', '--menu-items', str(path)])
+
+        assert result.exit_code != 0
+        assert "'price' must be a positive number" in result.output
+    assert db.session.get(MenuItem, 10) is None
+
+
+def test_import_does_not_build_an_in_memory_search_index(app, tmp_path):
+    app.config['SEARCH_BACKEND'] = 'memory'
+    path = tmp_path / 'restaurants.jsonl'
+    path.write_text(json.dumps({'id': 1, 'name': 'Pizza', 'address': '1 Main St'}) + '\n')
+    result = app.test_cli_runner().invoke(args=['catalog', 'import', '--restaurants', str(path)])
+
+    assert result.exit_code == 0, result.output
+    assert 'running workers pick up the changes' in result.output
+    assert app.extensions['search']['backend'] is None
@@ -0,0 +1,29 @@
+# tests/test_errors.py
+import logging
+
+from flask import abort
+
+
+def test_a_crash_is_logged_once(app, client, caplog):
+    app.config['PROPAGATE_EXCEPTIONS'] = False  # TESTING re-raises crashes instead of answering 500
+    @app.route('/crash')
+    def crash():
+        raise ValueError("boom")
+
+    with caplog.at_level(logging.ERROR):
+        response = client.get('/crash')
+
+    assert response.status_code == 500
+    assert response.get_json()['message'] == "An internal error occurred"
+    assert len([record for record in caplog.records if record.levelno >= logging.ERROR]) == 1
+
+
+def test_an_explicit_500_is_logged(app, client, caplog):
+    @app.route('/abort')
+    def explicit():
+        abort(500)
+
+    with caplog.at_level(logging.ERROR):
+        assert client.get('/abort').status_code == 500
+
+    assert len([record for record in caplog.records if record.levelno >= logging.ERROR]) == 1
@@ -0,0 +1,47 @@
+# tests/test_idempotency.py
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.idempotency import _load, _take_over
+from app.models import IdempotencyKey
+
+
+def add_abandoned_claim(user_id, key):
+    # A claim whose request died before storing a response
+    long_ago = datetime.utcnow() - timedelta(hours=1)
+    db.session.add(IdempotencyKey(user_id=user_id, key=key, request_hash='x', created_at=long_ago,
+                                  expires_at=long_ago + timedelta(days=1)))
+    db.session.commit()
+
+
+def test_only_one_of_two_racing_retries_takes_over_a_claim(app):
+    add_abandoned_claim(1, 'k')
+    record = _load(1, 'k') # Both retries read this same stale claim
+    seen = {'user_id': record.user_id, 'key': record.key, 'created_at': record.created_at}
+    db.session.expunge_all()
+
+    assert _take_over(IdempotencyKey(**seen)) is True
+    # Meanwhile the winner claimed the key again: the loser's delete must not remove that claim
+    db.session.add(IdempotencyKey(user_id=1, key='k', request_hash='x', created_at=datetime.utcnow(),
+                                  expires_at=datetime.utcnow() + timedelta(days=1)))
+    db.session.commit()
+    assert _take_over(IdempotencyKey(**seen)) is False
+    assert _load(1, 'k') is not None
+
+
+def test_waits_between_attempts_when_the_claim_keeps_vanishing(app, client, make_user, monkeypatch):
+    # Every claim fails, and every look-up finds nothing (released or taken over in between)
+    from app import idempotency
+    monkeypatch.setattr(idempotency, '_claim', lambda *args: False)
+    monkeypatch.setattr(idempotency, '_load', lambda *args: None)
+    sleeps = []
+    monkeypatch.setattr(idempotency.time, 'sleep', sleeps.append)
+    app.config['IDEMPOTENCY_WAIT'] = 0.05
+    _, headers = make_user()
+
+    response = client.post('/api/orders/', json={}, headers=dict(headers, **{'Idempotency-Key': 'k'}))
+
+    assert response.status_code == 409
+    # Backs off instead of spinning: 0.02, 0.04, 0.08, ... capped at 0.5
+    assert sleeps[:3] == [0.02, 0.04, 0.08]
+    assert max(sleeps) <= 0.5
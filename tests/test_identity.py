@@ -0,0 +1,19 @@
+# tests/test_identity.py
+from app.extensions import db
+from app.models import User
+
+
+def test_profile_cache_drops_a_user_after_the_update_commits(app, client, make_user):
+    user_id, headers = make_user('before')
+    assert client.get('/api/auth/me', headers=headers).get_json()['username'] == 'before'
+
+    user = db.session.get(User, user_id)
+    user.username = 'after'
+    db.session.flush()
+    # Another request between flush and commit reads the committed (old) row and caches it again
+    app.extensions['user_profiles'].set(f'user:{user.id}', {
+        'id': user.id, 'username': 'before', 'email': user.email, 'created_at': None,
+    })
+    db.session.commit()
+    # That copy is dropped once the change is committed
+    assert client.get('/api/auth/me', headers=headers).get_json()['username'] == 'after'
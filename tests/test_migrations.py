@@ -0,0 +1,42 @@
+# tests/test_migrations.py
+import importlib
+
+import sqlalchemy as sa
+
+from app.migrations import current_version, discover, upgrade
+
+
+def test_upgrade_adopts_a_database_made_by_create_all(tmp_path):
+    # The original schema with data in it, as the old db.create_all() in run.py left it
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    initial = importlib.import_module("app.migrations.0001_initial")
+    initial.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(sa.text("INSERT INTO restaurants (id, name, address) VALUES (1, 'Pizza', '1 Main St')"))
+
+    upgrade(engine, log=lambda message: None)
+
+    assert current_version(engine) == discover()[-1][0]
+    with engine.begin() as connection:
+        # The NOT NULL columns added later start at 1 for the existing rows
+        assert connection.execute(sa.text("SELECT version FROM restaurants WHERE id = 1")).scalar() == 1
+    # Nothing left to do the second time
+    assert upgrade(engine, log=lambda message: None) == []
+
+
+def test_upgrade_fills_the_search_table_from_the_catalog(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'catalog.db'}")
+    importlib.import_module("app.migrations.0001_initial").metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(sa.text("INSERT INTO restaurants (id, name, address) VALUES (1, 'Luigi', '1 Main St')"))
+        connection.execute(sa.text("INSERT INTO menu_items (id, restaurant_id, name, price, is_active) "
+                                   "VALUES (1, 1, 'Margherita', 9, 1), (2, 1, 'Calzone', 9, 0)"))
+
+    upgrade(engine, log=lambda message: None)
+
+    with engine.begin() as connection:
+        def search(word):
+            return connection.execute(sa.text(
+                "SELECT rowid FROM restaurant_search WHERE restaurant_search MATCH :word"), {"word": word}).scalars().all()
+        assert search("margherita") == [1]
+        assert search("calzone") == [] # Inactive items are not searchable
@@ -0,0 +1,29 @@
+# tests/test_order_events.py
+import time
+
+from app.events import order_events
+
+
+def test_long_poll_answers_at_once_when_the_worker_cannot_wait(app, client, make_user):
+    # Not a gevent worker: a waiting request would block the whole worker
+    user_id, headers = make_user()
+    order_events.publish(user_id, {"order_id": 1, "status": "preparing"})
+
+    started = time.monotonic()
+    response = client.get('/api/orders/events?after=0&timeout=10', headers=headers)
+
+    assert time.monotonic() - started < 1
+    body = response.get_json()
+    assert [event['order_id'] for event in body['events']] == [1]
+    assert body['poll_after'] == app.config['ORDER_EVENTS_POLL_INTERVAL']
+
+
+def test_stream_sends_what_is_new_and_ends_when_the_worker_cannot_wait(app, client, make_user):
+    user_id, headers = make_user()
+    order_events.publish(user_id, {"order_id": 1, "status": "preparing"})
+
+    response = client.get('/api/orders/events/stream', headers=dict(headers, **{'Last-Event-ID': '0'}))
+    body = response.get_data(as_text=True) # Returns: the stream ended by itself
+
+    assert body.startswith(f"retry: {app.config['ORDER_EVENTS_POLL_INTERVAL'] * 1000}\n\n")
+    assert 'id: 1\nevent: order\ndata: ' in body
@@ -0,0 +1,79 @@
+# tests/test_order_status.py
+from app.extensions import db
+from app.models import Order, Restaurant
+
+
+def make_order(user_id):
+    if db.session.get(Restaurant, 1) is None:
+        db.session.add(Restaurant(id=1, name='Pizza', address='1 Main St'))
+    order = Order(user_id=user_id, restaurant_id=1, total_price=10, status='pending')
+    db.session.add(order)
+    db.session.commit()
+    return order.id
+
+
+def test_bulk_status_only_moves_the_callers_own_orders(client, make_user):
+    alice, alice_headers = make_user('alice')
+    bob, _ = make_user('bob')
+    mine, theirs = make_order(alice), make_order(bob)
+
+    response = client.post('/api/orders/status/bulk', headers=alice_headers,
+                           json={'status': 'cancelled', 'orders': [mine, theirs, 999]})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [order['id'] for order in body['updated']] == [mine]
+    # Someone else's order looks exactly like one that doesn't exist: no status, no version
+    assert sorted(body['skipped'], key=lambda entry: entry['id']) == [
+        {'id': theirs, 'error': 'Order not found'}, {'id': 999, 'error': 'Order not found'}]
+    assert db.session.get(Order, theirs).status == 'pending'
+
+
+def test_staff_can_move_any_order(app, client, make_user):
+    customer, _ = make_user('customer')
+    staff, staff_headers = make_user('kitchen')
+    app.config['ORDER_STAFF_USER_IDS'] = {str(staff)}
+    order_id = make_order(customer)
+
+    response = client.post('/api/orders/status/bulk', headers=staff_headers,
+                           json={'status': 'preparing', 'orders': [order_id]})
+
+    assert [order['id'] for order in response.get_json()['updated']] == [order_id]
+
+
+def test_single_status_update_of_someone_elses_order_is_not_found(client, make_user):
+    _, alice_headers = make_user('alice')
+    bob, _ = make_user('bob')
+    theirs = make_order(bob)
+
+    response = client.patch(f'/api/orders/{theirs}/status', headers=alice_headers, json={'status': 'cancelled'})
+
+    assert response.status_code == 404
+    assert db.session.get(Order, theirs).status == 'pending'
+
+
+def test_customers_can_only_cancel_their_own_pending_orders(client, make_user):
+    customer, headers = make_user('customer')
+    order_id = make_order(customer)
+
+    for status in ('preparing', 'delivered'):
+        response = client.patch(f'/api/orders/{order_id}/status', headers=headers, json={'status': status})
+        assert response.status_code == 403
+        response = client.post('/api/orders/status/bulk', headers=headers, json={'status': status, 'orders': [order_id]})
+        assert response.status_code == 403
+    assert db.session.get(Order, order_id).status == 'pending'
+
+    response = client.patch(f'/api/orders/{order_id}/status', headers=headers, json={'status': 'cancelled'})
+    assert response.status_code == 200
+
+
+def test_customers_cannot_cancel_an_order_that_is_being_prepared(client, make_user):
+    customer, headers = make_user('customer')
+    order_id = make_order(customer)
+    db.session.get(Order, order_id).status = 'preparing'
+    db.session.commit()
+
+    response = client.patch(f'/api/orders/{order_id}/status', headers=headers, json={'status': 'cancelled'})
+
+    assert response.status_code == 409
+    assert db.session.get(Order, order_id).status == 'preparing'
@@ -0,0 +1,56 @@
+# tests/test_restaurants.py
+from app.extensions import db
+from app.models import Restaurant, MenuItem
+
+
+def add_restaurants(count, items_per_restaurant=3):
+    for i in range(count):
+        restaurant = Restaurant(name=f'Restaurant {i}', address='1 Main St')
+        db.session.add(restaurant)
+        db.session.flush()
+        for j in range(items_per_restaurant):
+            db.session.add(MenuItem(name=f'Dish {j}', price=5 + j, restaurant_id=restaurant.id))
+    db.session.commit()
+
+
+def test_listing_query_count_does_not_grow_with_page_size(client, count_queries):
+    add_restaurants(60)
+    client.get('/api/restaurants/?per_page=1') # Warm up (first connection, ...)
+
+    counts = {}
+    for per_page in (5, 50):
+        with count_queries() as counter:
+            response = client.get(f'/api/restaurants/?per_page={per_page}')
+        assert response.status_code == 200
+        assert len(response.get_json()['restaurants']) == per_page
+        counts[per_page] = counter.count
+
+    assert counts[5] == counts[50]
+
+
+def test_bulk_menu_update_rejects_values_the_columns_cannot_hold(client, make_user):
+    add_restaurants(1, items_per_restaurant=1)
+    bad_items = [
+        {'id': True, 'price': '5'},                                  # bool is not an id
+        {'name': 'x' * 121, 'price': '5'},
+        {'name': 42, 'price': '5'},
+        {'name': 'Soup', 'price': '5', 'description': 'x' * 256},
+        {'name': 'Soup', 'price': '100000000'},                      # Doesn't fit Numeric(10, 2)
+    ]
+    _, headers = make_user('owner')
+    for item in bad_items:
+        response = client.post('/api/restaurants/1/items/bulk', json={'items': [item]}, headers=headers)
+        assert response.status_code == 400, item
+    assert db.session.scalar(db.select(db.func.count(MenuItem.id))) == 1
+
+
+def test_bulk_menu_update_returns_created_ids_in_request_order(client, make_user):
+    add_restaurants(1, items_per_restaurant=0)
+    _, headers = make_user('owner')
+    names = [f'Dish {i}' for i in range(20)]
+    response = client.post('/api/restaurants/1/items/bulk', headers=headers,
+                           json={'items': [{'name': name, 'price': '5'} for name in names]})
+
+    assert response.status_code == 200
+    created_ids = response.get_json()['created_ids']
+    assert [db.session.get(MenuItem, item_id).name for item_id in created_ids] == names
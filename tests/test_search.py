@@ -0,0 +1,30 @@
+# tests/test_search.py
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models import MenuItem, Restaurant
+from app.search import InMemoryBackend, WATERMARK_OVERLAP
+
+
+def test_refresh_reindexes_only_what_changed_since_the_watermark(app):
+    long_ago = datetime.utcnow() - timedelta(days=1)
+    for rid in (1, 2, 3):
+        db.session.add(Restaurant(id=rid, name=f'Restaurant {rid}', address='1 Main St', updated_at=long_ago))
+    db.session.commit()
+    index = InMemoryBackend()
+    index.rebuild()
+
+    # Another worker adds a dish to restaurant 2 (and bumps its version, like every catalog write)
+    db.session.add(MenuItem(restaurant_id=2, name='Tiramisu', price=5))
+    db.session.execute(db.update(Restaurant).where(Restaurant.id == 2)
+                       .values(version=Restaurant.version + 1, updated_at=datetime.utcnow()))
+    db.session.commit()
+
+    reindexed = []
+    reindex = index.reindex
+    index.reindex = lambda ids: reindexed.extend(ids) or reindex(ids)
+    index.refresh()
+
+    assert reindexed == [2]
+    assert index.search(['tiramisu'], 10) == [2]
+    assert index._watermark > long_ago + WATERMARK_OVERLAP
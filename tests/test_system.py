@@ -0,0 +1,18 @@
+# tests/test_system.py
+
+
+def test_system_endpoints_need_a_reporting_user(app, client, make_user):
+    user_id, headers = make_user('viewer')
+
+    for path in ('/api/system/cache', '/api/system/load', '/api/system/metrics'):
+        assert client.get(path).status_code == 401
+        assert client.get(path, headers=headers).status_code == 403
+
+    app.config['REPORTING_USER_IDS'] = {str(user_id)}
+    for path in ('/api/system/cache', '/api/system/load', '/api/system/metrics'):
+        assert client.get(path, headers=headers).status_code == 200
+
+
+def test_system_endpoints_can_be_made_public(app, client):
+    app.config['SYSTEM_ENDPOINTS_PUBLIC'] = True
+    assert client.get('/api/system/metrics').status_code == 200